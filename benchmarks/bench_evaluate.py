@@ -0,0 +1,70 @@
+"""Benchmark evaluating a corpus of boards on a process pool.
+
+Run from the repository root:
+
+    python benchmarks/bench_evaluate.py --boards 20000 --workers 4
+
+Compares three ways to evaluate a function on every board: mapping the
+GameBoards over a pool (every board is pickled and packed in the worker),
+mapping the packed records over a pool, and `timeaftertime.evaluate`, which
+shares the records and results with the workers. The cheap `colors` function
+shows the overhead per board, `simulate` a realistic workload.
+"""
+from __future__ import annotations
+from typing import Callable, Dict, List
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import argparse
+import sys
+import time
+
+import numpy as np
+
+from timeaftertime.batch import generate_many
+from timeaftertime.evaluate import evaluate
+from timeaftertime.serialize import pack_board
+from timeaftertime.simulate import mean_score
+from timeaftertime.stats import to_records
+
+def red_cells(record: np.ndarray) -> float:
+    return float((record['colors'] == 1).sum())
+
+FUNCS = {'colors': red_cells, 'simulate': partial(mean_score, n=200, seed=0)}
+
+def _on_board(func: Callable, game_board) -> float:
+    return func(pack_board(game_board))
+
+def run(name: str, boards: List, records: np.ndarray, workers: int) -> Dict[str, float]:
+    func = FUNCS[name]
+    chunksize = max(1, len(boards) // (workers * 4))
+    seconds = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        start = time.perf_counter()
+        list(executor.map(partial(_on_board, func), boards, chunksize=chunksize))
+        seconds['pickle_boards'] = time.perf_counter() - start
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        start = time.perf_counter()
+        list(executor.map(func, records, chunksize=chunksize))
+        seconds['pickle_records'] = time.perf_counter() - start
+    start = time.perf_counter()
+    evaluate(records, func, workers=workers)
+    seconds['shared'] = time.perf_counter() - start
+    for method, s in seconds.items():
+        print(f'{name:9s} {method:15s} {s:8.3f} s {len(boards) / s:10.0f} boards/s', file=sys.stderr)
+    return seconds
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--boards', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--func', nargs='*', default=list(FUNCS), choices=list(FUNCS))
+    args = parser.parse_args(argv)
+    boards = generate_many(args.boards, seed=0, workers=args.workers)
+    records = to_records(boards)
+    for name in args.func:
+        # the simulation is about 1000x slower per board, evaluate fewer boards
+        n = len(boards) if name == 'colors' else max(1, len(boards) // 50)
+        run(name, boards[:n], records[:n], args.workers)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""Benchmark board generation across board sizes and settings.
+
+Run from the repository root:
+
+    python benchmarks/bench_generation.py --output bench.json
+    python benchmarks/bench_generation.py --compare bench.json
+
+Every case reports the time per call (min and median over the repeats), the
+peak traced memory and the number of memory blocks still allocated after a
+call. The JSON output can be compared across commits with --compare.
+"""
+from __future__ import annotations
+from typing import Callable, Dict, List
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from timeaftertime.core import Coord, Block, Board, ENGINES, board_coords
+from timeaftertime.game import GameBoard
+
+# (height, width, settings), small and large as in the README images
+SIZES = {
+    'small': (4, 7, {'num_dice': 3, 'num_star': 3}),
+    'default': (7, 15, {}),
+    'large': (15, 25, {}),
+    'stress50': (50, 50, {}),
+    'stress100': (100, 100, {}),
+}
+
+def _generated(height: int, width: int, settings: Dict, engine: str, seed: int = 0) -> GameBoard:
+    game_board = GameBoard(height, width, engine=engine, seed=seed, **settings)
+    game_board.initialize()
+    game_board.generate()
+    return game_board
+
+def case_coord_hash(height, width, settings, engine):
+    coords = [Coord(c.x, c.y) for c in board_coords(height, width)]
+    def run():
+        return {c: None for c in coords}
+    return run, len(coords)
+
+def case_block_is_connected(height, width, settings, engine):
+    blocks = _generated(height, width, settings, engine).board.blocks
+    def run():
+        for block in blocks:
+            block._is_connected(block.coords)
+    return run, len(blocks)
+
+def case_board_add_block(height, width, settings, engine):
+    blocks = _generated(height, width, settings, engine).board.blocks
+    blocks = [Block(block.coords, block.color) for block in blocks]
+    def run():
+        board = Board(height, width, engine=engine)
+        for block in blocks:
+            board.add_block(block)
+    return run, len(blocks)
+
+def case_coords_available_color(height, width, settings, engine):
+    blocks = _generated(height, width, settings, engine).board.blocks
+    board = Board(height, width, blocks[:len(blocks) // 2], engine=engine)
+    def run():
+        for color in range(1, 6):
+            board.coords_available_color(color)
+    return run, 5
+
+def case_generate(height, width, settings, engine):
+    seeds = iter(range(sys.maxsize))
+    def run():
+        _generated(height, width, settings, engine, next(seeds))
+    return run, 1
+
+def case_draw_layout(height, width, settings, engine):
+    game_board = _generated(height, width, settings, engine)
+    def run():
+        game_board.layout = {}
+        game_board.draw_layout()
+    return run, 1
+
+CASES = {
+    'coord_hash': case_coord_hash,
+    'block_is_connected': case_block_is_connected,
+    'board_add_block': case_board_add_block,
+    'coords_available_color': case_coords_available_color,
+    'generate': case_generate,
+    'draw_layout': case_draw_layout,
+}
+
+def measure(run: Callable, ops: int, min_time: float, max_repeats: int) -> Dict:
+    run()  # warm up caches
+    times = []
+    start = time.perf_counter()
+    while (len(times) < max_repeats) and ((len(times) < 3) or (time.perf_counter() - start < min_time)):
+        t0 = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - t0)
+
+    blocks_before = sys.getallocatedblocks()
+    tracemalloc.start()
+    result = run()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {'repeats': len(times),
+            'ops': ops,
+            'min_s': min(times),
+            'median_s': statistics.median(times),
+            'per_op_us': min(times) / ops * 1e6,
+            'peak_bytes': peak,
+            'retained_blocks': sys.getallocatedblocks() - blocks_before}
+
+def metadata() -> Dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {'commit': commit,
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+def run_benchmarks(cases: List[str], sizes: List[str], engines: List[str],
+                   min_time: float = 0.2, max_repeats: int = 100) -> List[Dict]:
+    results = []
+    for size in sizes:
+        height, width, settings = SIZES[size]
+        for engine in engines:
+            for name in cases:
+                run, ops = CASES[name](height, width, settings, engine)
+                result = {'case': name, 'size': size, 'height': height, 'width': width, 'engine': engine}
+                result.update(measure(run, ops, min_time, max_repeats))
+                print(f"{name:24s} {size:10s} {engine:9s} {result['min_s'] * 1e3:10.3f} ms "
+                      f"{result['peak_bytes'] / 1024:10.1f} KiB", file=sys.stderr)
+                results.append(result)
+    return results
+
+def compare(results: List[Dict], baseline: List[Dict]) -> None:
+    key = lambda r: (r['case'], r['size'], r['engine'])
+    old = {key(r): r for r in baseline}
+    print(f"{'case':24s} {'size':10s} {'engine':9s} {'old ms':>10s} {'new ms':>10s} {'speedup':>8s}")
+    for r in results:
+        if key(r) in old:
+            o = old[key(r)]
+            print(f"{r['case']:24s} {r['size']:10s} {r['engine']:9s} {o['min_s'] * 1e3:10.3f} "
+                  f"{r['min_s'] * 1e3:10.3f} {o['min_s'] / r['min_s']:8.2f}")
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--case', nargs='*', default=list(CASES), choices=list(CASES))
+    parser.add_argument('--size', nargs='*', default=list(SIZES), choices=list(SIZES))
+    parser.add_argument('--engine', nargs='*', default=list(ENGINES), choices=list(ENGINES))
+    parser.add_argument('--min-time', type=float, default=0.2, help='seconds to repeat each case for')
+    parser.add_argument('--max-repeats', type=int, default=100)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.case, args.size, args.engine, args.min_time, args.max_repeats)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'metadata': metadata(), 'results': results}, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f)['results'])
+
+if __name__ == '__main__':
+    main()
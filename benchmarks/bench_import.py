@@ -0,0 +1,106 @@
+"""Benchmark the import time of the package modules.
+
+Run from the repository root:
+
+    python benchmarks/bench_import.py --output import.json
+    python benchmarks/bench_import.py --compare import.json
+
+Every case runs in a fresh interpreter and reports the time to import the
+module (and to generate a board for the *_generate cases, as a short-lived
+worker would) and whether NumPy and pygame were imported along the way.
+"""
+from __future__ import annotations
+from typing import Dict, List
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+
+CASES = {
+    'core': 'import timeaftertime.core',
+    'game': 'import timeaftertime.game',
+    'batch': 'import timeaftertime.batch',
+    'visualize': 'import timeaftertime.visualize',
+    'game_generate': 'from timeaftertime.batch import generate_board; generate_board(0)',
+    'batch_generate_many': 'from timeaftertime.batch import generate_many; generate_many(4, seed=0, workers=1)',
+    # reference points
+    'python': 'pass',
+    'numpy': 'import numpy',
+}
+
+_SCRIPT = '''
+import sys, time, json
+start = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'numpy': 'numpy' in sys.modules, 'pygame': 'pygame' in sys.modules}}))
+'''
+
+def measure(statement: str, repeats: int) -> Dict:
+    results = []
+    for _ in range(repeats):
+        out = subprocess.run([sys.executable, '-c', _SCRIPT.format(statement=statement)],
+                             capture_output=True, text=True, check=True).stdout
+        results.append(json.loads(out.strip().splitlines()[-1]))
+    times = [r['seconds'] for r in results]
+    return {'repeats': repeats,
+            'min_s': min(times),
+            'median_s': statistics.median(times),
+            'numpy': results[-1]['numpy'],
+            'pygame': results[-1]['pygame']}
+
+def metadata() -> Dict:
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        commit = ''
+    return {'commit': commit,
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+
+def run_benchmarks(cases: List[str], repeats: int = 10) -> List[Dict]:
+    results = []
+    for name in cases:
+        try:
+            result = {'case': name}
+            result.update(measure(CASES[name], repeats))
+        except subprocess.CalledProcessError as e:
+            # e.g. pygame is not installed
+            print(f"{name:20s} failed: {e.stderr.strip().splitlines()[-1]}", file=sys.stderr)
+            continue
+        print(f"{name:20s} {result['median_s'] * 1e3:10.2f} ms  numpy={result['numpy']!s:5s} "
+              f"pygame={result['pygame']!s:5s}", file=sys.stderr)
+        results.append(result)
+    return results
+
+def compare(results: List[Dict], baseline: List[Dict]) -> None:
+    old = {r['case']: r for r in baseline}
+    print(f"{'case':20s} {'old ms':>10s} {'new ms':>10s} {'speedup':>8s}")
+    for r in results:
+        if r['case'] in old:
+            o = old[r['case']]
+            print(f"{r['case']:20s} {o['median_s'] * 1e3:10.2f} {r['median_s'] * 1e3:10.2f} "
+                  f"{o['median_s'] / r['median_s']:8.2f}")
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--case', nargs='*', default=list(CASES), choices=list(CASES))
+    parser.add_argument('--repeats', type=int, default=10)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.case, args.repeats)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump({'metadata': metadata(), 'results': results}, f, indent=1)
+    if args.compare:
+        with open(args.compare) as f:
+            compare(results, json.load(f)['results'])
+
+if __name__ == '__main__':
+    main()
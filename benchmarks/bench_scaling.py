@@ -0,0 +1,86 @@
+"""Benchmark how board generation scales with the number of cells.
+
+Run from the repository root:
+
+    python benchmarks/bench_scaling.py
+    python benchmarks/bench_scaling.py --engine local bitboard grid --size 50 100 200 --output scaling.json
+    python benchmarks/bench_scaling.py --num-colors 3
+
+Every size n generates an n x n board and reports the time per cell and the
+scaling exponent k of time ~ cells^k between consecutive sizes and over all
+sizes (k = 1 is linear). Every size runs with 5 colors and with 3 colors,
+where free cells regularly end up surrounded by all colors and generation
+repairs them by removing blocks. Larger sizes of an engine are skipped once a board
+took longer than --max-seconds.
+"""
+from __future__ import annotations
+from typing import Dict, List
+import argparse
+import json
+import math
+import sys
+import time
+
+from timeaftertime.core import ENGINES
+from timeaftertime.game import GameBoard
+
+def measure(size: int, engine: str, repeats: int, seed: int = 0, num_colors: int = 5) -> Dict:
+    times = []
+    for i in range(repeats):
+        game_board = GameBoard(size, size, engine=engine, seed=seed + i, num_colors=num_colors)
+        game_board.initialize()
+        start = time.perf_counter()
+        game_board.generate()
+        times.append(time.perf_counter() - start)
+    return {'engine': engine, 'num_colors': num_colors, 'size': size, 'cells': size * size, 'min_s': min(times),
+            'us_per_cell': min(times) / (size * size) * 1e6, 'blocks': len(game_board.board.blocks),
+            'repairs': game_board.num_repairs}
+
+def exponent(a: Dict, b: Dict) -> float:
+    return math.log(b['min_s'] / a['min_s']) / math.log(b['cells'] / a['cells'])
+
+def fit_exponent(results: List[Dict]) -> float:
+    # least squares slope of log(time) against log(cells)
+    xs = [math.log(r['cells']) for r in results]
+    ys = [math.log(r['min_s']) for r in results]
+    mx, my = sum(xs) / len(xs), sum(ys) / len(ys)
+    return sum((x - mx) * (y - my) for x, y in zip(xs, ys)) / sum((x - mx) ** 2 for x in xs)
+
+def run_benchmarks(sizes: List[int], engines: List[str], repeats: int = 1, max_seconds: float = 60,
+                   num_colors: List[int] = (5, 3)) -> List[Dict]:
+    results = []
+    for engine in engines:
+        for colors in num_colors:
+            engine_results = []
+            for size in sorted(sizes):
+                result = measure(size, engine, repeats, num_colors=colors)
+                if engine_results:
+                    result['exponent'] = exponent(engine_results[-1], result)
+                print(f"{engine:9s} {colors} colors {size:5d}x{size:<5d} {result['min_s']:9.3f} s "
+                      f"{result['us_per_cell']:8.2f} us/cell {result['repairs']:6d} repairs"
+                      + (f"  k={result['exponent']:.2f}" if 'exponent' in result else ''), file=sys.stderr)
+                engine_results.append(result)
+                if result['min_s'] > max_seconds:
+                    break
+            if len(engine_results) > 1:
+                print(f"{engine:9s} {colors} colors overall k={fit_exponent(engine_results):.2f}", file=sys.stderr)
+            results.extend(engine_results)
+    return results
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size', nargs='*', type=int, default=[50, 100, 200, 300, 500])
+    parser.add_argument('--engine', nargs='*', default=['local'], choices=list(ENGINES))
+    parser.add_argument('--num-colors', nargs='*', type=int, default=[5, 3])
+    parser.add_argument('--repeats', type=int, default=1)
+    parser.add_argument('--max-seconds', type=float, default=60)
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(args.size, args.engine, args.repeats, args.max_seconds, args.num_colors)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=1)
+
+if __name__ == '__main__':
+    main()
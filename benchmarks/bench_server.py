@@ -0,0 +1,87 @@
+"""Load test the board server on one machine.
+
+Run from the repository root, against a server started in-process:
+
+    python benchmarks/bench_server.py --requests 2000 --concurrency 32 --workers 4
+
+or against a running `python -m timeaftertime.server` with --port. A share of
+the requests (--repeat) asks for seeds that were requested before, to measure
+cache hits next to generation. Reports throughput and latency percentiles.
+"""
+from __future__ import annotations
+from typing import List
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+
+from timeaftertime.server import BoardServer, BoardService
+
+async def _client(port: int, targets: asyncio.Queue, latencies: List[float], query: str) -> None:
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    while not targets.empty():
+        seed = targets.get_nowait()
+        start = time.perf_counter()
+        writer.write(f'GET /board?seed={seed}{query} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+        await reader.readline()
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line == b'\r\n':
+                break
+            if line.lower().startswith(b'content-length:'):
+                length = int(line.split(b':')[1])
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+async def run(requests: int, concurrency: int, repeat: float, port: int = None, workers: int = None,
+              query: str = '') -> None:
+    server = service = None
+    if port is None:
+        service = BoardService(workers)
+        server = await BoardServer(service).start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        # start the worker processes before timing, with seeds that are never requested
+        await asyncio.gather(*[service.get(seed=2**62 + i) for i in range(workers or 1)])
+
+    rng = random.Random(0)
+    seeds = []
+    for i in range(requests):
+        seeds.append(rng.choice(seeds) if seeds and (rng.random() < repeat) else i)
+    targets = asyncio.Queue()
+    for seed in seeds:
+        targets.put_nowait(seed)
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*[_client(port, targets, latencies, query) for _ in range(concurrency)])
+    seconds = time.perf_counter() - start
+
+    latencies.sort()
+    percentile = lambda p: latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1e3
+    print(f'{len(latencies)} requests in {seconds:.2f}s: {len(latencies) / seconds:.1f} boards/s, '
+          f'latency p50 {percentile(0.5):.2f} ms, p95 {percentile(0.95):.2f} ms, '
+          f'p99 {percentile(0.99):.2f} ms, mean {statistics.mean(latencies) * 1e3:.2f} ms')
+    if service is not None:
+        print(json.dumps(service.stats()), file=sys.stderr)
+        server.close()
+        await server.wait_closed()
+        service.close()
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--repeat', type=float, default=0.2, help='share of requests for earlier seeds')
+    parser.add_argument('--workers', type=int, help='worker processes of the in-process server')
+    parser.add_argument('--port', type=int, help='load test a running server instead')
+    parser.add_argument('--query', default='', help="extra query parameters, e.g. '&height=15&width=25'")
+    args = parser.parse_args(argv)
+    asyncio.run(run(args.requests, args.concurrency, args.repeat, args.port, args.workers, args.query))
+
+if __name__ == '__main__':
+    main()
@@ -16,5 +16,6 @@ setuptools.setup(
         'Programming Language :: Python :: 3.8',
     ],
     include_package_data=True,
-    package_data={'': ['data/']}
+    package_data={'': ['data/']},
+    entry_points={'console_scripts': ['timeaftertime-visualize=timeaftertime.visualize:main']}
 )
\ No newline at end of file
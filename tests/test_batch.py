@@ -0,0 +1,44 @@
+from itertools import islice
+
+from timeaftertime.batch import derive_seed, generate_board, generate_many, iter_boards
+from timeaftertime.serialize import pack_board
+
+def test_derive_seed_deterministic():
+    assert derive_seed(1, 0) == derive_seed(1, 0)
+    assert derive_seed(1, 0) != derive_seed(1, 1)
+    assert derive_seed(1, 0) != derive_seed(2, 0)
+
+def test_generate_board_reproducible():
+    board1 = generate_board(42)
+    board2 = generate_board(42)
+    assert str(board1) == str(board2)
+    assert board1.layout == board2.layout
+
+def test_generate_many_independent_of_workers():
+    boards1 = generate_many(6, seed=3, workers=1)
+    boards2 = generate_many(6, seed=3, workers=2)
+    assert [str(b) for b in boards1] == [str(b) for b in boards2]
+    assert [b.seed for b in boards1] == [derive_seed(3, i) for i in range(6)]
+    assert all(b.board.is_full() for b in boards1)
+
+def test_generate_many_settings():
+    boards = generate_many(2, 5, 8, seed=3, workers=1, num_dice=2, num_star=3)
+    assert all(len(b.layout['dice']) == 2 for b in boards)
+    assert all(len(b.layout['star']) == 3 for b in boards)
+
+def test_iter_boards_matches_generate_many():
+    boards = generate_many(4, seed=3, workers=1)
+    assert [str(b) for b in iter_boards(seed=3, n=4)] == [str(b) for b in boards]
+    assert [str(b) for b in iter_boards(seed=3, n=4, workers=2, prefetch=1)] == [str(b) for b in boards]
+    assert [str(b) for b in iter_boards(seed=3, n=2, start=2)] == [str(b) for b in boards[2:]]
+
+def test_iter_boards_lazy():
+    boards = iter_boards(seed=3, workers=2)
+    first = [b.seed for b in islice(boards, 3)]
+    boards.close()
+    assert first == [derive_seed(3, i) for i in range(3)]
+
+def test_iter_boards_records():
+    records = list(iter_boards(seed=3, n=2, records=True))
+    boards = generate_many(2, seed=3, workers=1)
+    assert all(r.tobytes() == pack_board(b).tobytes() for r, b in zip(records, boards))
@@ -1,6 +1,9 @@
+import subprocess
+import sys
+
 import pytest
 
-from timeaftertime.core import Coord, Block, Board
+from timeaftertime.core import Coord, Block, Board, ENGINES, bitmask_full, bitmask_dilate, bitmask_is_connected
 
 # Coord tests
 def test_coord_initialization():
@@ -17,6 +20,16 @@ def test_coord_iterable():
     coord = Coord(1,2)
     assert [x for x in coord] == [1,2]
 
+def test_coord_hash():
+    assert hash(Coord(1,2)) == hash(Coord(1,2))
+    assert len({Coord(1,2), Coord(1,2), Coord(2,1)}) == 2
+
+def test_coord_to_tuple():
+    assert Coord(1,2).to_tuple() == (1,2)
+
+def test_coord_distance():
+    assert Coord(0,0).distance(Coord(2,-1)) == 3
+
 def test_coord_get_neighbors():
     coord = Coord(0,0)
     neighbors = coord.get_neighbors()
@@ -108,6 +121,30 @@ def test_block_remove_coords_some_in_coords():
     block.remove_coords([Coord(0,0), Coord(0,2)])
     assert block.coords == [Coord(0,1)]
 
+def test_block_remove_coord_disconnecting():
+    block = Block([Coord(0,0), Coord(0,1), Coord(0,2)])
+    with pytest.raises(AssertionError):
+        block.remove_coord(Coord(0,1))
+    assert block.coords == [Coord(0,0), Coord(0,1), Coord(0,2)]
+    # a cell on a cycle can be removed
+    block = Block([Coord(0,0), Coord(0,1), Coord(1,1), Coord(1,0)])
+    block.remove_coord(Coord(0,1))
+    assert block.coords == [Coord(0,0), Coord(1,1), Coord(1,0)]
+
+def test_block_remove_coords_disconnecting():
+    block = Block([Coord(0,0), Coord(0,1), Coord(0,2), Coord(0,3)])
+    with pytest.raises(AssertionError):
+        block.remove_coords([Coord(0,1), Coord(0,2)])
+    block.remove_coords([Coord(0,2), Coord(0,3)])
+    assert block.coords == [Coord(0,0), Coord(0,1)]
+
+def test_block_add_coords_to_empty():
+    block = Block()
+    block.add_coords([Coord(0,1), Coord(0,0)])
+    assert block.coords == [Coord(0,1), Coord(0,0)]
+    block.add_coord(Coord(1,0))
+    assert block.coords == [Coord(0,1), Coord(0,0), Coord(1,0)]
+
 def test_block_set_color():
     block = Block([Coord(0,0)], 1)
     assert block.color == 1
@@ -224,6 +261,17 @@ def test_board_remove_blocks():
     board.remove_block(block1)
     assert len(board.blocks) == 0
 
+@pytest.mark.parametrize('engine', list(ENGINES))
+def test_board_remove_block_not_on_board(engine):
+    board = Board(15,7, engine=engine)
+    block = Block([Coord(0,1)], 1)
+    board.add_block(block)
+    # Coord(15,0) is the cell after the last one of column 0, i.e. Coord(0,1) in column-major order
+    for other in [Block(), Block([Coord(15,0)], 1), Block([Coord(0,7)], 1), Block([Coord(1,1)], 1)]:
+        with pytest.raises(ValueError):
+            board.remove_block(other)
+    assert board.blocks == [block]
+
 def test_board_is_empty():
     # empty
     board = Board(2,2)
@@ -274,4 +322,174 @@ def test_board_coords_available_color_different_color():
     assert len(available_coords2) == 2*2-1
     assert Coord(0,0) not in available_coords2
     available_coords = board.coords_available()
-    assert available_coords == available_coords2
\ No newline at end of file
+    assert available_coords == available_coords2
+
+def test_board_initialization_with_blocks():
+    block = Block([Coord(0,0), Coord(0,1)], 1)
+    board = Board(2,2,[block])
+    assert board.blocks == [block]
+    assert board.coords_available() == [Coord(1,0), Coord(1,1)]
+
+def test_board_remove_block_frees_coords():
+    board = Board(2,2)
+    block = Block([Coord(0,0), Coord(0,1)], 1)
+    board.add_block(block)
+    board.remove_block(block)
+    assert board.is_empty()
+    assert len(board.coords_available()) == 2*2
+    assert len(board.coords_available_color(1)) == 2*2
+
+def test_board_block_at():
+    board = Board(2,2)
+    block = Block([Coord(0,0), Coord(0,1)], 1)
+    board.add_block(block)
+    assert board.block_at(Coord(0,1)) is block
+    assert board.block_at(Coord(1,1)) is None
+
+# Bitboard tests
+
+def test_bitmask_dilate_does_not_wrap():
+    full = bitmask_full(2,2)
+    # Coord(1,0) is bit 1, Coord(0,1) is bit 3
+    assert bitmask_dilate(1 << 1, 2, full) == (1 << 0) | (1 << 1) | (1 << 4)
+    assert bitmask_dilate(1 << 3, 2, full) == (1 << 0) | (1 << 3) | (1 << 4)
+
+def test_bitmask_is_connected():
+    block = Block([Coord(0,0), Coord(0,1), Coord(1,1)])
+    assert bitmask_is_connected(block.to_bitmask(3), 3)
+    assert not bitmask_is_connected(block.to_bitmask(3) & ~(1 << 4), 3)
+    assert not bitmask_is_connected(0, 3)
+
+def test_block_bitmask_roundtrip():
+    block = Block([Coord(1,0), Coord(1,1), Coord(2,1)], 3)
+    other = Block.from_bitmask(block.to_bitmask(4), 4, 3)
+    assert set(other.coords) == set(block.coords)
+    assert other.color == 3
+
+def test_block_bitboard_agrees():
+    shapes = [[Coord(0,0), Coord(1,0)], [Coord(2,0), Coord(2,1)], [Coord(1,0), Coord(1,1)],
+              [Coord(0,2), Coord(0,3)], [Coord(3,3)]]
+    for height in [None, 4]:
+        blocks = [Block(coords, 1, height) for coords in shapes]
+        assert [[a.overlaps(b) for b in blocks] for a in blocks] == \
+            [[a.overlaps(b) for b in blocks] for a in [Block(coords, 1) for coords in shapes]]
+        assert [[a.neighbors(b) for b in blocks] for a in blocks] == \
+            [[a.neighbors(b) for b in blocks] for a in [Block(coords, 1) for coords in shapes]]
+
+def test_block_bitboard_connectivity():
+    block = Block([Coord(0,0), Coord(0,1), Coord(1,1)], 1, 3)
+    assert block.to_bitmask(3) == (1 << 0) | (1 << 4) | (1 << 5)
+    with pytest.raises(AssertionError):
+        block.remove_coord(Coord(0,1))
+    with pytest.raises(AssertionError):
+        block.add_coord(Coord(2,0))
+    block.add_coords([Coord(2,1), Coord(2,0)])
+    block.remove_coords([Coord(0,0), Coord(0,1)])
+    assert block.to_bitmask(3) == Block(block.coords).to_bitmask(3)
+    with pytest.raises(AssertionError):
+        Block([Coord(0,0), Coord(1,1)], 1, 3)
+
+def test_block_bitboard_rejected_add():
+    # a rejected add leaves the block unchanged, also in bitboard mode
+    block = Block([Coord(0,0)], 1, 3)
+    with pytest.raises(AssertionError):
+        block.add_coords([Coord(2,2)])
+    assert block.to_bitmask(3) == 1
+    with pytest.raises(AssertionError):
+        block.add_coord(Coord(2,1))
+    assert block.coords == [Coord(0,0)]
+
+def test_board_equality_ignores_engine():
+    block = Block([Coord(0,0), Coord(0,1)], 1)
+    assert Board(2,2,[block], engine='grid') == Board(2,2,[block], engine='bitboard')
+
+@pytest.mark.parametrize('engine', list(ENGINES))
+def test_board_engines_agree(engine):
+    board = Board(3,4, engine=engine)
+    board.add_block(Block([Coord(0,0), Coord(1,0)], 1))
+    board.add_block(Block([Coord(2,0), Coord(2,1), Coord(1,1)], 2))
+    with pytest.raises(AssertionError):
+        board.add_block(Block([Coord(0,1)], 1))
+    with pytest.raises(AssertionError):
+        board.add_block(Block([Coord(2,3), Coord(3,3)], 1))
+    with pytest.raises(AssertionError):
+        board.add_block(Block([Coord(1,1), Coord(1,2)], 3))
+    assert board.coords_available() == [Coord(0,1), Coord(0,2), Coord(1,2), Coord(2,2),
+                                        Coord(0,3), Coord(1,3), Coord(2,3)]
+    assert board.coords_available_color(1) == [Coord(0,2), Coord(1,2), Coord(2,2),
+                                               Coord(0,3), Coord(1,3), Coord(2,3)]
+    assert board.coords_available_color(2) == [Coord(0,2), Coord(0,3), Coord(1,3), Coord(2,3)]
+    assert board._get_color_coords(2) == [Coord(2,0), Coord(1,1), Coord(2,1)]
+    assert board.block_at(Coord(1,1)).color == 2
+    board.remove_block(board.blocks[0])
+    assert board.block_at(Coord(0,0)) is None
+    assert len(board.coords_available_color(1)) == 3*4-3
+
+def test_board_grid_roundtrip():
+    board = Board(2,3)
+    board.add_block(Block([Coord(0,0), Coord(1,0)], 1))
+    board.add_block(Block([Coord(0,1), Coord(0,2)], 2))
+    colors, labels = board.to_grid()
+    assert colors.tolist() == [[1,2,2], [1,0,0]]
+    assert labels.tolist() == [[0,1,1], [0,-1,-1]]
+    other = Board.from_grid(colors)
+    assert str(other) == str(board)
+    assert [set(b.coords) for b in other.blocks] == [set(b.coords) for b in board.blocks]
+
+@pytest.mark.parametrize('engine', list(ENGINES))
+def test_board_available_color_tracking(engine):
+    board = Board(3,4, engine=engine)
+    assert board.viable_colors([1,2]) == [1,2]
+    assert board.first_available_color(1) == Coord(0,0)
+    block1 = Block([Coord(0,0), Coord(1,0)], 1)
+    block2 = Block([Coord(2,0), Coord(2,1)], 2)
+    board.add_block(block1)
+    board.add_block(block2)
+    for color in [1,2,3]:
+        available = board.coords_available_color(color)
+        assert board.num_available_color(color) == len(available)
+        assert board.first_available_color(color) == available[0]
+        assert all(board.is_available_color(c, color) == (c in available)
+                   for c in board._get_board_coords())
+    assert not board.is_available_color(Coord(3,0), 3)
+    assert board.first_available_color(1) == Coord(0,2)
+    board.remove_block(block1)
+    assert board.first_available_color(1) == Coord(0,0)
+    assert board.num_available_color(1) == 3*4-2
+    assert board.num_available_color(3) == 3*4-2
+
+def test_board_viable_colors():
+    board = Board(1,3)
+    board.add_block(Block([Coord(0,0)], 1))
+    board.add_block(Block([Coord(0,2)], 2))
+    assert board.viable_colors([1,2,3]) == [3]
+    assert board.first_available_color(1) is None
+
+@pytest.mark.parametrize('engine', list(ENGINES))
+def test_board_color_grid(engine):
+    board = Board(2,3, engine=engine)
+    board.add_block(Block([Coord(0,0), Coord(1,0)], 1))
+    board.add_block(Block([Coord(0,1), Coord(0,2)], 2))
+    assert board.color_grid().tolist() == [[1,2,2], [1,0,0]]
+
+@pytest.mark.parametrize('engine', list(ENGINES))
+def test_board_first_free(engine):
+    board = Board(2,3, engine=engine)
+    assert board.first_free() == Coord(0,0)
+    block = Block([Coord(0,0), Coord(1,0), Coord(1,1)], 1)
+    board.add_block(block)
+    assert board.first_free() == Coord(0,1)
+    board.add_block(Block([Coord(0,1), Coord(0,2), Coord(1,2)], 2))
+    assert board.first_free() is None
+    board.remove_block(block)
+    assert board.first_free() == Coord(0,0)
+
+def test_auto_engine():
+    assert Board(7, 15).engine == 'bitboard'
+    assert Board(100, 100).engine == 'local'
+    assert Board(7, 15, engine='grid').engine == 'grid'
+
+def test_import_without_numpy():
+    code = ('import sys; from timeaftertime.batch import generate_board; generate_board(1); '
+            'assert "numpy" not in sys.modules')
+    subprocess.run([sys.executable, '-c', code], check=True)
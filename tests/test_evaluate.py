@@ -0,0 +1,48 @@
+from functools import partial
+
+import numpy as np
+import pytest
+
+from timeaftertime.batch import generate_many
+from timeaftertime.evaluate import SharedArray, evaluate
+from timeaftertime.simulate import mean_score
+from timeaftertime.stats import to_records
+
+def _color_counts(record):
+    return tuple(int((record['colors'] == c).sum()) for c in range(1, 6))
+
+def _fail(record):
+    raise ValueError('no evaluation')
+
+def test_shared_array_pickle():
+    import pickle
+    shared = SharedArray((2, 3), np.int32)
+    try:
+        shared.array[:] = [[1, 2, 3], [4, 5, 6]]
+        other = pickle.loads(pickle.dumps(shared))
+        other.array[1, 2] = 7
+        assert shared.array.tolist() == [[1, 2, 3], [4, 5, 7]]
+        other.close()
+    finally:
+        shared.close()
+
+def test_evaluate():
+    game_boards = generate_many(12, seed=1, workers=1)
+    records = to_records(game_boards)
+    func = partial(mean_score, n=20, seed=0)
+    expected = evaluate(records, func, workers=1)
+    assert expected.shape == (12,)
+    assert (evaluate(records, func, workers=2, chunksize=5) == expected).all()
+    assert (evaluate(game_boards, func, workers=2) == expected).all()
+
+def test_evaluate_structured_results():
+    records = to_records(generate_many(6, seed=1, workers=1))
+    dtype = np.dtype([(name, np.int64) for name in 'rbgoy'])
+    results = evaluate(records, _color_counts, dtype=dtype, workers=2)
+    assert results['r'].tolist() == [(r['colors'] == 1).sum() for r in records]
+    assert sum(results[name] for name in 'rbgoy').tolist() == [7 * 15] * 6
+
+def test_evaluate_error():
+    records = to_records(generate_many(4, seed=1, workers=1))
+    with pytest.raises(ValueError, match='no evaluation'):
+        evaluate(records, _fail, workers=2)
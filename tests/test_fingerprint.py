@@ -0,0 +1,42 @@
+import numpy as np
+
+from timeaftertime.core import Board
+from timeaftertime.batch import generate_board
+from timeaftertime.fingerprint import fingerprint, fingerprints, Deduplicator, unique_boards
+from timeaftertime.vectorized import generate_grids
+
+def test_fingerprint_color_permutation():
+    colors = generate_board(1).board.color_grid()
+    permutation = np.array([0, 4, 1, 5, 3, 2], dtype=np.uint8)
+    assert fingerprint(permutation[colors]) == fingerprint(colors)
+    assert fingerprint(colors[::-1]) != fingerprint(colors)
+
+def test_fingerprint_block_order():
+    game_board = generate_board(2)
+    board = game_board.board
+    reordered = Board(board.height, board.width, board.blocks[::-1], engine='bitboard')
+    assert fingerprint(reordered) == fingerprint(game_board)
+
+def test_fingerprint_mirror():
+    colors = generate_board(3).board.color_grid()
+    for mirrored in [colors[::-1], colors[:, ::-1], colors[::-1, ::-1]]:
+        assert fingerprint(mirrored, mirror=True) == fingerprint(colors, mirror=True)
+
+def test_fingerprints_batch():
+    colors, _ = generate_grids(20, 4, 5, seed=1)
+    assert fingerprints(colors) == [fingerprint(c) for c in colors]
+    assert fingerprints(colors, mirror=True) == [fingerprint(c, mirror=True) for c in colors]
+
+def test_deduplicator():
+    boards = [generate_board(seed) for seed in [4, 5, 4]]
+    dedup = Deduplicator()
+    assert [dedup.add(b) for b in boards] == [True, True, False]
+    assert len(dedup) == 2
+    assert dedup.num_duplicates == 1
+    assert boards[0] in dedup
+    assert len(list(unique_boards(boards))) == 2
+
+def test_deduplicator_mirror():
+    colors = generate_board(6).board.color_grid()
+    assert len(list(unique_boards([colors, colors[::-1]]))) == 2
+    assert len(list(unique_boards([colors, colors[::-1]], mirror=True))) == 1
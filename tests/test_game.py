@@ -0,0 +1,196 @@
+import pytest
+
+from timeaftertime.core import Coord, Block
+from timeaftertime.game import GameBoard, GenerationError
+
+def test_draw_connected_coords():
+    game_board = GameBoard(4, 4, seed=1)
+    game_board.initialize()
+    game_board.board.add_block(Block([Coord(0,1), Coord(0,2)], 1))
+    for _ in range(20):
+        coords = game_board._draw_connected_coords(Coord(0,0), 1, 3)
+        # (0,0) can only grow down, cells next to the color 1 block are not available
+        assert coords == [Coord(0,0), Coord(1,0), Coord(2,0)]
+
+def test_draw_connected_coords_length():
+    game_board = GameBoard(4, 4, seed=2)
+    game_board.initialize()
+    for length in range(1, 7):
+        coords = game_board._draw_connected_coords(Coord(2,2), 1, length)
+        assert len(coords) == len(set(coords)) == length
+        Block(coords)
+
+def test_generate():
+    game_board = GameBoard(seed=3)
+    game_board.initialize()
+    game_board.generate()
+    assert game_board.board.is_full()
+    assert all(len(block.coords) < game_board.max_block_size for block in game_board.board.blocks)
+
+@pytest.mark.parametrize('num_colors', [3, 5])
+def test_generate_engines_agree(num_colors):
+    # a 30x40 board is large enough for repairs and for 'auto' to pick the local engine
+    boards = []
+    for engine in ['local', 'bitboard', 'grid']:
+        game_board = GameBoard(30, 40, seed=4, num_colors=num_colors, engine=engine)
+        game_board.initialize()
+        game_board.generate()
+        boards.append(game_board.board.color_grid().tolist())
+    assert boards[0] == boards[1] == boards[2]
+
+def test_generate_repairs_dead_ends():
+    # with three colors free cells can end up surrounded by all colors
+    num_repairs = 0
+    for seed in range(10):
+        game_board = GameBoard(seed=seed, num_colors=3)
+        game_board.initialize()
+        game_board.generate()
+        assert game_board.board.is_full()
+        num_repairs += game_board.num_repairs
+    assert num_repairs > 0
+
+def test_repair_removes_surrounding_blocks():
+    game_board = GameBoard(1, 3, num_colors=2)
+    game_board.initialize()
+    game_board.board.add_block(Block([Coord(0,0)], 1))
+    game_board.board.add_block(Block([Coord(0,2)], 2))
+    game_board.draw_block()
+    assert game_board.num_repairs == 1
+    assert game_board.board.is_empty()
+
+def test_repair_budget():
+    game_board = GameBoard(1, 3, num_colors=2, max_repairs=0)
+    game_board.initialize()
+    game_board.board.add_block(Block([Coord(0,0)], 1))
+    game_board.board.add_block(Block([Coord(0,2)], 2))
+    with pytest.raises(GenerationError):
+        game_board.draw_block()
+
+def test_repair_budget_per_cell():
+    # the budget bounds the repairs at each dead cell, not over the whole board
+    game_board = GameBoard(30, 40, seed=0, num_colors=3, max_repairs=2)
+    game_board.initialize()
+    game_board.generate()
+    assert game_board.board.is_full()
+    assert game_board.num_repairs > game_board.max_repairs
+
+def test_generate_resets_repairs():
+    game_board = GameBoard(30, 40, seed=0, num_colors=3)
+    game_board.initialize()
+    game_board.generate()
+    assert game_board.num_repairs > 0
+    # five colors never run into dead ends
+    game_board.num_colors = 5
+    game_board.initialize()
+    game_board.generate()
+    assert game_board.num_repairs == 0
+
+def test_repair_time_budget():
+    game_board = GameBoard(10, 10, seed=1, num_colors=2, time_budget=0)
+    game_board.initialize()
+    with pytest.raises(GenerationError):
+        game_board.generate()
+
+def test_instrument():
+    events = []
+    game_board = GameBoard(seed=4)
+    stats = game_board.instrument(hook=lambda name, value: events.append(name))
+    game_board.initialize()
+    game_board.generate()
+    num_blocks = len(game_board.board.blocks)
+    assert stats.calls['draw_block'] == stats.calls['add_block'] == num_blocks
+    assert stats.calls['_draw_connected_coords'] == num_blocks
+    assert stats.calls['draw_layout'] == stats.calls['draw_attributes'] == 1
+    assert stats.seconds['draw_block'] >= stats.seconds['add_block']
+    assert len(events) >= 3 * num_blocks + 2
+    assert stats.counts.get('rejected_placements', 0) == 0
+
+def test_instrument_unviable_colors():
+    game_board = GameBoard(seed=0, num_colors=3)
+    stats = game_board.instrument()
+    game_board.initialize()
+    game_board.generate()
+    assert stats.counts['repairs'] == game_board.num_repairs > 0
+    # every repair follows a draw in which none of the colors fit
+    assert stats.counts['unviable_colors'] >= 3 * game_board.num_repairs
+
+def test_instrument_rejected_placements():
+    game_board = GameBoard(seed=5)
+    game_board.initialize()
+    stats = game_board.instrument()
+    game_board.board.add_block(Block([Coord(0,0)], 1))
+    with pytest.raises(AssertionError):
+        game_board.board.add_block(Block([Coord(0,0)], 2))
+    assert stats.counts['rejected_placements'] == 1
+    assert stats.calls['add_block'] == 2
+
+def test_not_instrumented():
+    game_board = GameBoard(seed=6)
+    game_board.initialize()
+    assert game_board.stats is None
+    assert 'draw_block' not in vars(game_board)
+
+def _generated(seed, **settings):
+    game_board = GameBoard(seed=seed, **settings)
+    game_board.initialize()
+    game_board.generate()
+    return game_board
+
+def test_target_sampler_block_sizes():
+    sizes = [0] * 4
+    for seed in range(10):
+        game_board = _generated(seed, block_size_weights=[0, 0, 1, 3])
+        assert game_board.board.is_full()
+        for block in game_board.board.blocks:
+            sizes[len(block.coords)-1] += 1
+        assert game_board._size_counts == [sum(len(b.coords) == i for b in game_board.board.blocks)
+                                           for i in range(1, 5)]
+    # only pockets without room for a larger block get smaller blocks
+    assert sizes[3] > 2 * sizes[2] > sizes[0] + sizes[1]
+
+def test_target_sampler_color_balance():
+    cells = [0] * 5
+    for seed in range(10):
+        for block in _generated(seed, color_weights=[4, 1, 1, 1, 1]).board.blocks:
+            cells[block.color-1] += len(block.coords)
+    assert abs(cells[0] / sum(cells) - 0.5) < 0.05
+
+def test_target_sampler_reproducible():
+    board1 = _generated(5, block_size_weights=[1, 2, 3])
+    board2 = _generated(5, block_size_weights=[1, 2, 3])
+    assert str(board1) == str(board2)
+    assert all(len(block.coords) <= 3 for block in board1.board.blocks)
+
+def test_target_sampler_repairs():
+    game_board = _generated(1, num_colors=3, block_size_weights=[0, 0, 0, 1])
+    assert game_board.board.is_full()
+    assert sum(game_board._color_cells) == game_board.height * game_board.width
+
+def test_draw_attributes():
+    game_board = _generated(1)
+    blocks = {c: block for block in game_board.board.blocks for c in block.coords}
+    dice, star = game_board.layout['dice'], game_board.layout['star']
+    assert (len(dice), len(star)) == (game_board.num_dice, game_board.num_star)
+    assert len(set(dice) | set(star)) == len(dice) + len(star)
+    for coords in [dice, star]:
+        assert len({id(blocks[c]) for c in coords}) == len(coords)
+
+def test_draw_attributes_caps():
+    for seed in range(5):
+        game_board = _generated(seed, num_star=15, column_caps={'star': 1}, color_caps={'star': 3, 'dice': 1})
+        colors = game_board.board.color_grid()
+        assert sorted(c.y for c in game_board.layout['star']) == list(range(15))
+        assert sorted(colors[c] for c in game_board.layout['star']) == [1]*3 + [2]*3 + [3]*3 + [4]*3 + [5]*3
+        assert sorted(colors[c] for c in game_board.layout['dice']) == [1, 2, 3, 4, 5]
+
+def test_draw_attributes_unsatisfiable():
+    game_board = _generated(1)
+    with pytest.raises(ValueError, match='blocks'):
+        game_board.draw_attributes({'star': len(game_board.board.blocks) + 1})
+    with pytest.raises(ValueError, match='per column'):
+        game_board.draw_attributes({'star': 16}, column_caps={'star': 1})
+    with pytest.raises(ValueError, match='per color'):
+        game_board.draw_attributes({'dice': 6}, color_caps={'dice': 1})
+    # a 3x5 board has too few blocks for the default 13 stars
+    with pytest.raises(ValueError, match='star'):
+        _generated(1, height=3, width=5)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from timeaftertime.batch import generate_board
+from timeaftertime.render import (SpriteAtlas, board_items, render_board, screen_size, write_png,
+                                  GREY, WHITE, HEIGHT_BLOCKS, WIDTH_BLOCKS)
+
+def _atlas(game_board, scale=1):
+    names = {value for kind, _, value in board_items(game_board) if kind == 'image'}
+    size = (HEIGHT_BLOCKS * scale, WIDTH_BLOCKS * scale)
+    sprites = {name: np.full(size + (3,), i, dtype=np.uint8) for i, name in enumerate(sorted(names))}
+    # a fully transparent sprite shows the background
+    sprites['heart_alpha'] = np.zeros(size + (4,), dtype=np.uint8)
+    return SpriteAtlas(sprites)
+
+def test_board_items_do_not_overlap():
+    game_board = generate_board(1)
+    rects = [rect for kind, rect, _ in board_items(game_board) if kind == 'image']
+    mask = np.zeros(screen_size(game_board)[::-1], dtype=int)
+    for left, top, w, h in rects:
+        mask[top:top+h, left:left+w] += 1
+    assert mask.max() == 1
+    assert len(rects) == game_board.height * game_board.width + 4 * game_board.width + 3 * game_board.height
+
+def test_render_board():
+    game_board = generate_board(1)
+    atlas = _atlas(game_board)
+    image = render_board(game_board, atlas)
+    width, height = screen_size(game_board)
+    assert image.shape == (height, width, 3)
+    assert image.dtype == np.uint8
+    assert (image[0, 0] == GREY).all()
+    for kind, (left, top, w, h), value in board_items(game_board):
+        if (kind == 'image') and (value != 'heart_alpha'):
+            assert (image[top:top+h, left:left+w] == atlas.index[value]).all()
+        elif value == 'heart_alpha':
+            assert (image[top:top+h, left:left+w] == GREY).all()
+
+def test_render_board_scale():
+    game_board = generate_board(1)
+    image = render_board(game_board, _atlas(game_board, scale=2), scale=2)
+    width, height = screen_size(game_board)
+    assert image.shape == (height * 2, width * 2, 3)
+    _, (left, top, _, _), _ = board_items(game_board, scale=2)[1]
+    assert (image[top, left] == WHITE).all()
+
+def test_write_png(tmp_path):
+    pygame = pytest.importorskip('pygame')
+    game_board = generate_board(1)
+    image = render_board(game_board, _atlas(game_board))
+    write_png(image, tmp_path / 'board.png')
+    loaded = pygame.surfarray.array3d(pygame.image.load(str(tmp_path / 'board.png'))).swapaxes(0, 1)
+    assert (loaded == image).all()
@@ -0,0 +1,57 @@
+import io
+
+import pytest
+
+from timeaftertime.batch import generate_board
+from timeaftertime.serialize import BoardWriter, BoardReader, pack_board, unpack_board, read_boards
+
+def assert_same_board(game_board, other):
+    assert str(other) == str(game_board)
+    assert other.layout == game_board.layout
+    assert other.seed == game_board.seed
+    assert [set(b.coords) for b in other.board.blocks] == [set(b.coords) for b in game_board.board.blocks]
+
+def test_pack_unpack():
+    game_board = generate_board(1)
+    record = pack_board(game_board)
+    assert record.dtype.itemsize < 512
+    assert_same_board(game_board, unpack_board(record))
+
+def test_pack_seed():
+    game_board = generate_board(2**63 - 1)
+    assert unpack_board(pack_board(game_board)).seed == 2**63 - 1
+    game_board.seed = None
+    assert unpack_board(pack_board(game_board)).seed is None
+    for seed in [-1, 2**63, 'abc']:
+        game_board.seed = seed
+        with pytest.raises(ValueError):
+            pack_board(game_board)
+
+def test_stream_roundtrip(tmp_path):
+    boards = [generate_board(2), generate_board(3, 15, 25), generate_board(4, 4, 7, num_dice=3, num_star=3)]
+    path = tmp_path / 'boards.tatb'
+    with BoardWriter(path) as writer:
+        for game_board in boards[:2]:
+            writer.write(game_board)
+    with BoardWriter(path) as writer:
+        writer.write(boards[2])
+    others = list(read_boards(path))
+    assert len(others) == len(boards)
+    for game_board, other in zip(boards, others):
+        assert_same_board(game_board, other)
+    assert len(list(read_boards(path, raw=True))) == 3
+
+def test_stream_file_object():
+    buffer = io.BytesIO()
+    BoardWriter(buffer).write(generate_board(5))
+    buffer.seek(0)
+    assert len(list(BoardReader(buffer))) == 1
+
+def test_stream_invalid():
+    with pytest.raises(ValueError):
+        BoardReader(io.BytesIO(b'not a board stream'))
+    buffer = io.BytesIO()
+    BoardWriter(buffer).write(generate_board(6))
+    buffer = io.BytesIO(buffer.getvalue()[:-1])
+    with pytest.raises(ValueError):
+        list(BoardReader(buffer))
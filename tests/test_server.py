@@ -0,0 +1,107 @@
+import asyncio
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from timeaftertime.batch import generate_board
+from timeaftertime.game import GenerationError
+from timeaftertime.serialize import pack_board, record_from_bytes
+from timeaftertime.server import BoardServer, BoardService, board_json
+
+def _service(**kwargs):
+    return BoardService(executor=ThreadPoolExecutor(2), **kwargs)
+
+def test_service_cache_and_coalescing():
+    async def run():
+        service = _service(cache_size=2)
+        records = await asyncio.gather(*[service.get(seed=1) for _ in range(3)])
+        assert all(r.tobytes() == pack_board(generate_board(1)).tobytes() for r in records)
+        assert service.stats()['generated'] == 1
+        assert service.stats()['coalesced'] == 2
+        await service.get(seed=1)
+        assert service.stats()['hits'] == 1
+        # seed 1 is evicted as least recently used
+        await service.get(seed=2)
+        await service.get(seed=3)
+        await service.get(seed=1)
+        assert service.stats()['generated'] == 4
+        assert service.stats()['cached'] == 2
+        service.close()
+    asyncio.run(run())
+
+def test_service_errors():
+    async def run():
+        service = _service()
+        with pytest.raises(ValueError, match='unknown'):
+            await service.get(seed=1, foo=1)
+        with pytest.raises(ValueError, match='cells'):
+            await service.get(1000, 1000, seed=1)
+        with pytest.raises(ValueError, match='star'):
+            await service.get(3, 5, seed=1)
+        for seed in [-1, 2**64]:
+            with pytest.raises(ValueError, match='seed'):
+                await service.get(seed=seed)
+        with pytest.raises(ValueError, match='num_colors'):
+            await service.get(seed=1, num_colors=2)
+        with pytest.raises(ValueError, match='max_repairs'):
+            await service.get(seed=1, max_repairs=10**6)
+        assert service.stats()['errors'] == 1
+        assert len(service.pending) == 0
+        service.close()
+    asyncio.run(run())
+
+def test_service_time_budget():
+    async def run():
+        service = _service(time_budget=0)
+        # a 3-color board of this size needs repairs, which check the time budget
+        with pytest.raises(GenerationError, match='repairs'):
+            await service.get(30, 40, seed=0, num_colors=3)
+        service.close()
+    asyncio.run(run())
+
+def test_board_json():
+    game_board = generate_board(1)
+    board = board_json(pack_board(game_board))
+    assert board['seed'] == 1
+    assert board['colors'] == ''.join(str(c) for c in game_board.board.color_grid().ravel())
+    assert board['star'] == [c.x * 15 + c.y for c in game_board.layout['star']]
+
+async def _get(port, target, connection='keep-alive'):
+    reader, writer = await asyncio.open_connection('127.0.0.1', port)
+    responses = []
+    for t in ([target] if isinstance(target, str) else target):
+        writer.write(f'GET {t} HTTP/1.1\r\nHost: localhost\r\nConnection: {connection}\r\n\r\n'.encode())
+        status = int((await reader.readline()).split()[1])
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line == b'\r\n':
+                break
+            name, _, value = line.decode().partition(':')
+            headers[name.lower()] = value.strip()
+        responses.append((status, await reader.readexactly(int(headers['content-length']))))
+    writer.close()
+    return responses
+
+def test_server():
+    async def run():
+        service = _service()
+        server = await BoardServer(service).start(port=0)
+        port = server.sockets[0].getsockname()[1]
+        (status, body), (_, binary), (_, stats) = await _get(
+            port, ['/board?seed=4&num_star=10', '/board?seed=4&num_star=10&format=binary', '/stats'])
+        assert status == 200
+        board = json.loads(body)
+        assert (board['seed'], len(board['star'])) == (4, 10)
+        record = record_from_bytes(binary)
+        assert record.tobytes() == pack_board(generate_board(4, num_star=10)).tobytes()
+        assert json.loads(stats)['hits'] == 1
+        assert (await _get(port, '/board?seed=1&foo=2', 'close'))[0][0] == 422
+        assert (await _get(port, '/board?seed=18446744073709551616', 'close'))[0][0] == 422
+        assert (await _get(port, '/board?height=x', 'close'))[0][0] == 400
+        assert (await _get(port, '/nothing', 'close'))[0][0] == 404
+        server.close()
+        await server.wait_closed()
+        service.close()
+    asyncio.run(run())
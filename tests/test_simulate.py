@@ -0,0 +1,55 @@
+import numpy as np
+
+from timeaftertime.batch import generate_board
+from timeaftertime.serialize import pack_board
+from timeaftertime.simulate import _Model, _block_tables, _play, simulate, simulate_many
+
+def test_block_tables():
+    # a block of three cells in a row
+    room, move = _block_tables(3, (0b010, 0b101, 0b010))
+    assert room[0, 0] == 0
+    assert room[0, 0b001] == 3
+    assert move[0, 0b001, 2] == 0b011
+    # moves start at the entry, a marked middle cell splits the rest
+    assert move[0, 0b100, 1] == 0b100
+    assert move[0, 0b100, 2] == 0b110
+    assert room[0b010, 0] == 1
+    assert room[0b111, 0b111] == 0
+
+def test_simulate_marks_connected_cells():
+    record = pack_board(generate_board(1))
+    model = _Model(record)
+    masks, _, played = _play(model, 50, np.random.default_rng(0), 'greedy', 30, 8, 2, 1.0)
+    grid = model.grid(model.marked(masks))
+    height, width, _ = grid.shape
+    start = int(record['start_column'])
+    assert (played <= 30).all()
+    for g in range(50):
+        stack = [(x, start) for x in range(height) if grid[x, start, g]]
+        seen = set(stack)
+        while stack:
+            x, y = stack.pop()
+            for c in [(x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)]:
+                if (0 <= c[0] < height) and (0 <= c[1] < width) and grid[c + (g,)] and (c not in seen):
+                    seen.add(c)
+                    stack.append(c)
+        assert len(seen) == grid[..., g].sum() > 0
+
+def test_simulate():
+    game_board = generate_board(1)
+    result = simulate(game_board, n=500, seed=1)
+    assert (simulate(pack_board(game_board), n=500, seed=1).scores == result.scores).all()
+    assert result.columns.shape == (500, game_board.width)
+    assert result.colors.shape == (500, 5)
+    assert (result.jokers >= 0).all()
+    assert (result.stars <= game_board.num_star).all()
+    summary = result.summary()
+    low, histogram = summary['histogram']
+    assert sum(histogram) == summary['games'] == 500
+    assert low == summary['min'] <= summary['percentiles'][50] <= summary['max']
+
+def test_greedy_beats_random():
+    summaries = simulate_many([generate_board(2)] * 2, n=1000, seed=0)
+    random = simulate(generate_board(2), n=1000, seed=0, policy='random').summary()
+    assert summaries[0]['mean'] > random['mean']
+    assert summaries[0]['mean_cells'] > random['mean_cells']
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from timeaftertime.batch import generate_many
+from timeaftertime.serialize import unpack_board
+from timeaftertime.stats import (block_adjacency, block_counts, block_size_histogram, block_sizes,
+                                 cells_per_color, cells_per_column, color_adjacency, color_counts,
+                                 compare, compare_to_real, corpus_stats, real_board, to_records)
+
+COLORS = np.array([[[1, 1, 2],
+                    [3, 2, 2]]])
+LABELS = np.array([[[0, 0, 2],
+                    [1, 2, 2]]])
+
+def test_block_statistics():
+    assert block_sizes(LABELS)[0, :3].tolist() == [2, 1, 3]
+    assert block_size_histogram(LABELS).tolist() == [0, 1, 1, 1]
+    assert color_counts(COLORS, 3).tolist() == [[2, 3, 1]]
+    assert block_counts(COLORS, LABELS, 3).tolist() == [[1, 1, 1]]
+
+def test_free_cells_are_ignored():
+    labels = np.where(LABELS == 2, -1, LABELS)
+    colors = np.where(LABELS == 2, 0, COLORS)
+    assert block_sizes(labels)[0, :3].tolist() == [2, 1, 0]
+    assert color_counts(colors, 3).tolist() == [[2, 0, 1]]
+
+def test_adjacency():
+    # cell pairs: 1-1, 1-2, 1-3, 1-2, 2-2, 3-2, 2-2
+    assert color_adjacency(COLORS, 3).tolist() == [[1, 2, 1], [2, 2, 1], [1, 1, 0]]
+    counts, degrees = block_adjacency(COLORS, LABELS, 3)
+    assert counts.tolist() == [[0, 1, 1], [1, 0, 1], [1, 1, 0]]
+    assert degrees[0, :3].tolist() == [2, 2, 2]
+
+def test_cells_per_column_and_color():
+    indices = np.array([[0, 4, 5]])
+    assert cells_per_column(indices, 3).tolist() == [[1, 1, 1]]
+    assert cells_per_color(indices, COLORS, 3).tolist() == [[1, 2, 0]]
+
+def test_real_board():
+    record = real_board()
+    game_board = unpack_board(record)
+    assert game_board.board.is_full()
+    assert len(game_board.board.blocks) == 30
+    stats = corpus_stats(record)
+    assert np.allclose(stats['color_share'], 0.2)
+    assert np.allclose(stats['star_color_share'], 0.2)
+    assert np.allclose(stats['dice_color_share'], 0.2)
+    assert np.allclose(stats['star_column_share'], 1 / 15)
+    assert np.allclose(np.diag(stats['block_adjacency_share']), 0)
+    assert all(value == 0 for value in compare(stats, stats).values())
+
+def test_corpus_matches_block_objects():
+    boards = generate_many(5, seed=1, workers=1)
+    records = to_records(boards)
+    sizes = [len(block.coords) for b in boards for block in b.board.blocks]
+    assert block_size_histogram(records['labels']).tolist() == np.bincount(sizes).tolist()
+    stats = corpus_stats(records)
+    assert stats['blocks'] == np.mean([len(b.board.blocks) for b in boards])
+    assert np.allclose(np.diag(stats['block_adjacency_share']), 0)
+    distances = compare_to_real(records)
+    assert all(0 <= distances[name] <= 1 for name in distances if name.endswith('_share'))
+
+def test_num_colors_of_corpus():
+    records = to_records(generate_many(5, seed=1, workers=1, num_colors=6))
+    stats = corpus_stats(records)
+    assert stats['color_share'].shape == stats['blocks_per_color'].shape == (6,)
+    assert stats['color_adjacency_share'].shape == (6, 6)
+    assert compare_to_real(records)['color_share'] > 0
+    assert color_counts(COLORS, 4).tolist() == [[2, 3, 1, 0]]
+    with pytest.raises(ValueError, match='num_colors'):
+        corpus_stats(records, 5)
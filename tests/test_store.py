@@ -0,0 +1,54 @@
+import pytest
+
+from timeaftertime.batch import generate_many, generate_board
+from timeaftertime.store import BoardStore
+
+@pytest.fixture
+def boards():
+    return generate_many(5, seed=1, workers=1)
+
+def test_store_random_access(tmp_path, boards):
+    store = BoardStore.create(tmp_path / 'boards.store')
+    assert len(store) == 0
+    store.extend(boards[:3])
+    assert store.append(boards[3]) == 3
+    assert len(store) == 4
+    for i in [2, 0, 3]:
+        assert str(store[i]) == str(boards[i])
+        assert store[i].layout == boards[i].layout
+    assert store.records['colors'].shape == (4, 7, 15)
+
+def test_store_seed_index(tmp_path, boards):
+    store = BoardStore.create(tmp_path / 'boards.store')
+    store.extend(boards)
+    store.build_index()
+    reopened = BoardStore(tmp_path / 'boards.store')
+    for i, game_board in enumerate(boards):
+        assert reopened.find(game_board.seed, 7, 15) == i
+        assert str(reopened.get(game_board.seed)) == str(game_board)
+    with pytest.raises(KeyError):
+        reopened.find(-5)
+    with pytest.raises(KeyError):
+        reopened.find(boards[0].seed, 4, 7)
+
+def test_store_stale_index(tmp_path, boards):
+    store = BoardStore.create(tmp_path / 'boards.store')
+    store.extend(boards[:2])
+    store.build_index()
+    store.extend(boards[2:])
+    assert store.find(boards[-1].seed) == len(boards) - 1
+    store.extend([generate_board(7)])
+    with pytest.raises(ValueError):
+        BoardStore(tmp_path / 'boards.store').find(7)
+
+def test_store_wrong_shape(tmp_path):
+    store = BoardStore.create(tmp_path / 'boards.store', 4, 7, num_dice=3, num_star=3)
+    with pytest.raises(ValueError):
+        store.append(generate_board(1))
+
+def test_store_sample(tmp_path, boards):
+    store = BoardStore.create(tmp_path / 'boards.store')
+    store.extend(boards)
+    sample = store.sample(3, seed=1)
+    assert len(sample) == 3
+    assert all(str(b) in [str(o) for o in boards] for b in sample)
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+
+from timeaftertime.game import GenerationError
+from timeaftertime.vectorized import generate_grids, to_board, to_game_board
+
+def test_generate_grids_shape():
+    colors, labels = generate_grids(10, 4, 6, seed=1)
+    assert colors.shape == labels.shape == (10, 4, 6)
+    assert (colors > 0).all() & (colors <= 5).all()
+    assert (labels >= 0).all()
+
+def test_generate_grids_reproducible():
+    colors1, labels1 = generate_grids(5, 4, 6, seed=1)
+    colors2, labels2 = generate_grids(5, 4, 6, seed=1)
+    assert (colors1 == colors2).all() & (labels1 == labels2).all()
+
+def test_generate_grids_valid_boards():
+    colors, labels = generate_grids(20, 5, 7, seed=2, max_block_size=4)
+    for i in range(20):
+        # Board.add_block rejects overlapping and same-color neighboring blocks
+        board = to_board(colors[i], labels[i])
+        assert board.is_full()
+        assert len(board.blocks) == labels[i].max() + 1
+        assert max(len(block.coords) for block in board.blocks) <= 4
+
+def test_generate_grids_dead_ends():
+    colors, labels = generate_grids(20, 5, 5, seed=3, num_colors=3)
+    assert (labels >= 0).all()
+    assert all(to_board(colors[i]).is_full() for i in range(20))
+
+def test_generate_grids_single_board_dead_ends():
+    # a single board restarts whenever it runs into a dead end
+    for seed in range(10):
+        colors, labels = generate_grids(1, 7, 15, seed=seed, num_colors=3)
+        assert to_board(colors[0], labels[0]).is_full()
+
+def test_generate_grids_max_restarts():
+    with pytest.raises(GenerationError, match='restarts'):
+        generate_grids(2, 7, 15, seed=1, num_colors=2, max_restarts=10)
+
+def test_to_game_board():
+    colors, labels = generate_grids(1, 7, 15, seed=4)
+    game_board = to_game_board(colors[0], labels[0], seed=4)
+    assert game_board.board.is_full()
+    assert len(game_board.layout['star']) == game_board.num_star
+    assert np.array_equal(game_board.board.to_grid()[0], colors[0])
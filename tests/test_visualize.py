@@ -0,0 +1,56 @@
+import os
+
+import pytest
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+pygame = pytest.importorskip('pygame')
+
+from timeaftertime import visualize
+from timeaftertime.batch import generate_board
+from timeaftertime.render import board_items
+from timeaftertime.visualize import BoardView, SpriteCache, dirty_rects
+
+@pytest.fixture
+def loads(tmp_path, monkeypatch):
+    """Serve dummy sprites from tmp_path and record every image that is loaded."""
+    names = set()
+    for seed in [1, 2]:
+        names.update(value for kind, _, value in board_items(generate_board(seed)) if kind == 'image')
+    for i, name in enumerate(sorted(names)):
+        sprite = pygame.Surface((4, 4))
+        sprite.fill((i, i, i))
+        path = tmp_path / f'{name}.png'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        pygame.image.save(sprite, str(path))
+    loaded = []
+    load = pygame.image.load
+    monkeypatch.setattr(pygame.image, 'load', lambda path: loaded.append(path) or load(path))
+    monkeypatch.setattr(visualize, 'sprites', SpriteCache(str(tmp_path)))
+    return loaded
+
+def test_sprites_loaded_once(loads):
+    game_board = generate_board(1)
+    view = BoardView(game_board)
+    view.update(game_board)
+    view.update(generate_board(2))
+    assert len(loads) == len(set(loads))
+
+def test_update_same_board(loads):
+    game_board = generate_board(1)
+    view = BoardView(game_board)
+    assert view.update(game_board) == []
+
+def test_update_new_board(loads):
+    game_board, other = generate_board(1), generate_board(2)
+    view = BoardView(game_board)
+    rects = view.update(other)
+    changed = set(board_items(game_board)).symmetric_difference(board_items(other))
+    # only the changed cells are redrawn, not the whole board
+    assert {tuple(rect) for rect in rects} == {rect for _, rect, _ in changed}
+    assert 0 < len({tuple(rect) for rect in rects}) < len(board_items(other))
+
+def test_dirty_rects():
+    items = [('fill', (0, 0, 10, 10), (0, 0, 0)), ('image', (10, 0, 10, 10), 'heart')]
+    assert dirty_rects(items, items) == []
+    rects = dirty_rects(items, items[:1] + [('image', (10, 0, 10, 10), 'star')])
+    assert {tuple(rect) for rect in rects} == {(10, 0, 10, 10)}
@@ -0,0 +1,94 @@
+from __future__ import annotations
+from typing import TYPE_CHECKING, Iterator, List, Union
+from collections import deque
+from functools import partial
+from hashlib import blake2b
+from itertools import count
+from random import SystemRandom
+import os
+
+from timeaftertime.game import GameBoard
+
+if TYPE_CHECKING:
+    import numpy as np
+
+def derive_seed(seed: int, index: int) -> int:
+    """Derive the seed of board `index` from a master seed.
+
+    The seeds are independent of the process generating the board, so a board
+    can be reproduced with `GameBoard(..., seed=derive_seed(seed, index))`.
+    """
+    digest = blake2b(f'{seed}:{index}'.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') >> 1
+
+def generate_board(seed: int, height: int = 7, width: int = 15, **settings) -> GameBoard:
+    game_board = GameBoard(height, width, seed=seed, **settings)
+    game_board.initialize()
+    game_board.generate()
+    return game_board
+
+def generate_record(seed: int, height: int = 7, width: int = 15, **settings) -> np.ndarray:
+    """Generate a board and return its packed record (see `timeaftertime.serialize`)."""
+    from timeaftertime.serialize import pack_board
+
+    return pack_board(generate_board(seed, height, width, **settings))
+
+def generate_many(n: int, height: int = 7, width: int = 15, seed: int = None, workers: int = None,
+                  chunksize: int = None, **settings) -> List[GameBoard]:
+    """Generate n boards, board i using its own seed derived from the master seed.
+
+    The boards are returned in index order, so the result only depends on the
+    seed and not on the number of workers. Generation runs on a process pool
+    with `workers` processes (all cores by default, in-process if 1).
+    """
+    if seed is None:
+        seed = SystemRandom().getrandbits(63)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    seeds = [derive_seed(seed, i) for i in range(n)]
+    generate = partial(generate_board, height=height, width=width, **settings)
+    if (workers == 1) or (n <= 1):
+        return [generate(s) for s in seeds]
+    if chunksize is None:
+        chunksize = max(1, n // (workers * 4))
+    # multiprocessing is only imported when a pool is used
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(generate, seeds, chunksize=chunksize))
+
+def iter_boards(height: int = 7, width: int = 15, seed: int = None, n: int = None, start: int = 0,
+                workers: int = 1, prefetch: int = None, records: bool = False,
+                **settings) -> Iterator[Union[GameBoard, np.ndarray]]:
+    """Lazily yield generated boards, board i using the seed derived from the master seed.
+
+    Yields boards `start`, `start + 1`, ... (forever if n is None) in index
+    order, the same boards as `generate_many`. With records=True the packed
+    board records of `timeaftertime.serialize` are yielded instead. With more
+    than one worker at most `prefetch` boards (2 per worker by default) are
+    generated ahead of the consumer.
+    """
+    if seed is None:
+        seed = SystemRandom().getrandbits(63)
+    indices = count(start) if n is None else range(start, start + n)
+    generate = partial(generate_record if records else generate_board, height=height, width=width, **settings)
+    if workers == 1:
+        for i in indices:
+            yield generate(derive_seed(seed, i))
+        return
+    if prefetch is None:
+        prefetch = 2 * workers
+    assert prefetch >= 1
+    from concurrent.futures import ProcessPoolExecutor
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = deque()
+        try:
+            for i in indices:
+                pending.append(executor.submit(generate, derive_seed(seed, i)))
+                if len(pending) >= prefetch:
+                    yield pending.popleft().result()
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            # the consumer stopped early, drop the boards generated ahead
+            for future in pending:
+                future.cancel()
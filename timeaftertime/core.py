@@ -1,8 +1,27 @@
 from __future__ import annotations  # necessary until python 4.0 for future references
-from typing import List, Tuple, Hashable, Generator, Dict
+from typing import List, Tuple, Hashable, Generator, Dict, NamedTuple, Set
+from bisect import bisect_left
+from functools import lru_cache
 from dataclasses import dataclass, field
+import importlib
 
-import numpy as np
+class _LazyModule:
+    # stands in for a module until its first attribute is used, the first use
+    # rebinds the name in the owner's namespace so later lookups hit the module
+
+    def __init__(self, name: str, namespace: Dict, alias: str):
+        self._name = name
+        self._namespace = namespace
+        self._alias = alias
+
+    def __getattr__(self, attr: str):
+        module = importlib.import_module(self._name)
+        self._namespace[self._alias] = module
+        return getattr(module, attr)
+
+# NumPy is only needed by the grid engine and the grid conversions, generating
+# boards with the bitboard engine does not import it
+np = _LazyModule('numpy', globals(), 'np')
 
 def invert_list_of_coords(coords: List[Coord]) -> Tuple[List[int],List[int]]:
     return list(map(list, zip(*coords)))
@@ -10,41 +29,83 @@ def invert_list_of_coords(coords: List[Coord]) -> Tuple[List[int],List[int]]:
 def flatten_list(list_of_lists: List[List]) -> List:
     return [item for sublist in list_of_lists for item in sublist]
 
+_tuple_new = tuple.__new__
+
 if True:
-    @dataclass
-    class Coord:
+    class Coord(NamedTuple):
+        # tuple-backed, so hashing and equality are done on two ints in C
         x: int
         y: int
 
-        def __hash__(self) -> Hashable:
-            return hash(str(self))
-
-        def __eq__(self, other: Coord) -> bool:
-            return (self.x == other.x) & (self.y == other.y)
-        
-        def __iter__(self) -> Generator[int, int, None]:
-            yield self.x
-            yield self.y
-
         def to_tuple(self) -> Tuple[int,int]:
             return (self.x, self.y)
 
         def get_neighbors(self) -> List[Coord]:
-            return  [Coord(self.x - 1, self.y), 
-                     Coord(self.x + 1, self.y), 
-                     Coord(self.x, self.y - 1), 
-                     Coord(self.x, self.y + 1)]
+            # tuple.__new__ skips the Python-level Coord.__new__, this is the hottest call
+            x, y = self
+            return  [_tuple_new(Coord, (x - 1, y)),
+                     _tuple_new(Coord, (x + 1, y)),
+                     _tuple_new(Coord, (x, y - 1)),
+                     _tuple_new(Coord, (x, y + 1))]
         
         def distance(self, other):
             return abs(self.x-other.x) + abs(self.y-other.y)
 
+@lru_cache(maxsize=None)
+def board_coords(height: int, width: int) -> Tuple[Coord, ...]:
+    """Return the interned coordinates of a board in column-major order."""
+    return tuple(Coord(i,j) for j in range(width) for i in range(height))
+
+# Bitboards store a board of size (height, width) in a single int, bit
+# y*(height+1) + x is set for Coord(x, y). Every column is followed by an
+# always-empty padding bit so that shifting by one never wraps to the next column.
+
+def bitmask_stride(height: int) -> int:
+    return height + 1
+
+def bitmask_full(height: int, width: int) -> int:
+    stride = bitmask_stride(height)
+    return sum(((1 << height) - 1) << (j * stride) for j in range(width))
+
+def bitmask_dilate(mask: int, height: int, full: int) -> int:
+    """Return mask extended with all its horizontal and vertical neighbors."""
+    stride = bitmask_stride(height)
+    return (mask | (mask << 1) | (mask >> 1) | (mask << stride) | (mask >> stride)) & full
+
+def bitmask_flood_fill(seed: int, mask: int, height: int) -> int:
+    """Return all bits of mask connected to seed using shift-and-mask steps."""
+    region = seed & mask
+    while True:
+        grown = bitmask_dilate(region, height, mask)
+        if grown == region:
+            return region
+        region = grown
+
+def bitmask_is_connected(mask: int, height: int) -> bool:
+    if mask == 0:
+        return False
+    return bitmask_flood_fill(mask & -mask, mask, height) == mask
+
+def bitmask_popcount(mask: int) -> int:
+    return bin(mask).count('1')
+
 if True:
     @dataclass
     class Block:
         coords: List[Coord] = field(default_factory=list)
         color: int = 0
+        # with the height of its board the block also keeps its cells as a bitmask,
+        # overlaps, neighbors and the connectivity checks then use shift-and-mask
+        # operations when both blocks have one
+        height: int = field(default=None, repr=False, compare=False)
+
+        # cell set kept in sync by the add/remove methods for O(1) membership
+        _cells: Set[Coord] = field(init=False, repr=False, compare=False)
+        _mask: int = field(init=False, repr=False, compare=False)
 
         def __post_init__(self):
+            self._cells = set(self.coords)
+            self._mask = None if self.height is None else self._mask_of(self._cells, self.height)
             assert self.is_empty(self.coords) | self._is_connected(self.coords)
 
         def __str__(self) -> str:
@@ -59,6 +120,34 @@ if True:
         def to_tuple(self):
             return [c.to_tuple() for c in self.coords]
 
+        def to_bitmask(self, height: int) -> int:
+            if (self._mask is not None) and (height == self.height):
+                return self._mask
+            return self._mask_of(self._cells, height)
+
+        @staticmethod
+        def _mask_of(coords, height: int) -> int:
+            stride = bitmask_stride(height)
+            mask = 0
+            for c in coords:
+                assert (0 <= c.x < height) & (c.y >= 0)
+                mask |= 1 << (c.y * stride + c.x)
+            return mask
+
+        def _same_bitboard(self, other: Block) -> bool:
+            return (self._mask is not None) and (other._mask is not None) and (self.height == other.height)
+
+        @classmethod
+        def from_bitmask(cls, mask: int, height: int, color: int = 0) -> Block:
+            stride = bitmask_stride(height)
+            coords = []
+            while mask:
+                low = mask & -mask
+                y, x = divmod(low.bit_length() - 1, stride)
+                coords.append(Coord(x, y))
+                mask ^= low
+            return cls(coords, color, height)
+
         def _is_connected(self, coords: List[Coord]) -> bool:
             """Use a depth-first search (DFS) algorithm to check if all coordinates are connected.
             
@@ -67,70 +156,600 @@ if True:
 
             if self.is_empty(coords):
                 return False
-            if len(set(coords)) == 1:
-                return True
+            if self._mask is not None:
+                return bitmask_is_connected(self._mask_of(coords, self.height), self.height)
+            cells = set(coords)
+            return len(self._reachable(coords[0], cells)) == len(cells)
 
-            def find_neighbors(coord, coords):
-                candidates = coord.get_neighbors()  
-                return [c for c in candidates if c in coords]
-
-            seen = set()
-            frontier = [coords[0]]
-            while not len(frontier) == 0:
+        def _reachable(self, origin: Coord, cells: Set[Coord], targets: Set[Coord] = None) -> Set[Coord]:
+            # depth-first search from origin within cells, stopping early once all targets are seen
+            seen = {origin}
+            frontier = [origin]
+            remaining = None if targets is None else len(targets - seen)
+            while (len(frontier) > 0) and (remaining != 0):
                 coord = frontier.pop()
-                seen.add(coord)
-                frontier.extend([n for n in find_neighbors(coord, coords) if not n in seen])
-            return len(seen) == len(set(coords))
+                for n in coord.get_neighbors():
+                    if (n in cells) and (n not in seen):
+                        seen.add(n)
+                        frontier.append(n)
+                        if (targets is not None) and (n in targets):
+                            remaining -= 1
+            return seen
+
+        def _touches(self, coord: Coord, cells: Set[Coord]) -> bool:
+            for n in coord.get_neighbors():
+                if n in cells:
+                    return True
+            return False
+
+        def _stays_connected(self, removed: Set[Coord]) -> bool:
+            if self._mask is not None:
+                remaining = self._mask & ~self._mask_of(removed, self.height)
+                return (remaining == 0) or bitmask_is_connected(remaining, self.height)
+            # the rest of the block stays connected iff the remaining cells bordering
+            # the removed ones are still connected to each other
+            remaining = self._cells - removed
+            border = {n for c in removed for n in c.get_neighbors() if n in remaining}
+            if len(border) <= 1:
+                return True
+            origin = next(iter(border))
+            return border <= self._reachable(origin, remaining, border)
         
         def is_empty(self, coords) -> bool:
             return len(coords) == 0
         
         def add_coord(self, coord: Coord) -> List[Coord]:
-            assert coord not in self.coords
-            coords_extended = self.coords + [coord]
-            assert self._is_connected(coords_extended)
-            self.coords = coords_extended
+            assert coord not in self._cells
+            if self._mask is None:
+                assert self.is_empty(self._cells) | self._touches(coord, self._cells)
+            else:
+                bit = self._mask_of([coord], self.height)
+                assert (self._mask == 0) | (bitmask_dilate(bit, self.height, self._mask) != 0)
+                self._mask |= bit
+            self.coords = self.coords + [coord]
+            self._cells.add(coord)
         
         def add_coords(self, coords: List[Coord]) -> List[Coord]:
-            coords_extended = self.coords + coords
-            assert len(coords_extended) == len(set(coords_extended))
-            assert self._is_connected(coords_extended)
-            self.coords = coords_extended
+            new_cells = set(coords)
+            assert len(new_cells) == len(coords)
+            assert self._cells.isdisjoint(new_cells)
+            assert not (self.is_empty(self._cells) & self.is_empty(new_cells))
+            if self._mask is not None:
+                # a rejected add leaves the block unchanged
+                mask = self._mask | self._mask_of(new_cells, self.height)
+                assert bitmask_is_connected(mask, self.height)
+                self._mask = mask
+                self.coords = self.coords + coords
+                self._cells |= new_cells
+                return
+            # grow from the new cells touching the block (or any one if the block is empty)
+            if self.is_empty(self._cells):
+                frontier = [coords[0]]
+            else:
+                frontier = [c for c in coords if self._touches(c, self._cells)]
+            seen = set(frontier)
+            while len(frontier) > 0:
+                coord = frontier.pop()
+                for n in coord.get_neighbors():
+                    if (n in new_cells) and (n not in seen):
+                        seen.add(n)
+                        frontier.append(n)
+            assert len(seen) == len(new_cells)
+            self.coords = self.coords + coords
+            self._cells |= new_cells
 
         def remove_coord(self, coord: Coord) -> List[Coord]:
-            coords = [c for c in self.coords if c != coord]
-            assert self.is_empty(coords) | self._is_connected(coords)
-            self.coords = coords
+            if coord not in self._cells:
+                return
+            assert self._stays_connected({coord})
+            self.coords = [c for c in self.coords if c != coord]
+            self._cells.discard(coord)
+            if self._mask is not None:
+                self._mask &= ~self._mask_of([coord], self.height)
         
         def remove_coords(self, coords: List[Coord]) -> List[Coord]:
-            coords = [c for c in self.coords if c not in coords]
-            assert self.is_empty(coords) | self._is_connected(coords)
-            self.coords = coords
+            removed = self._cells.intersection(coords)
+            if self.is_empty(removed):
+                return
+            assert self._stays_connected(removed)
+            self.coords = [c for c in self.coords if c not in removed]
+            self._cells -= removed
+            if self._mask is not None:
+                self._mask &= ~self._mask_of(removed, self.height)
         
         def set_color(self, color: int) -> None:
             self.color = color
 
         def overlaps(self, other: Block) -> bool:
-            overlap = set(self.coords).intersection(set(other.coords))
-            return len(overlap) > 0
+            if self._same_bitboard(other):
+                return (self._mask & other._mask) != 0
+            return not self._cells.isdisjoint(other._cells)
 
         def neighbors(self, other: Block, overlap_allowed: bool=False, same_color: bool=False) -> bool:
             if self.is_empty(self.coords) | self.is_empty(other.coords):
                 return False
             if same_color & (self.color != other.color):
                 return False
-            are_neighbors = self._is_connected(self.coords + other.coords)
+            # both blocks are connected, so their union is connected iff they overlap or touch
+            if self._same_bitboard(other):
+                are_neighbors = bitmask_dilate(self._mask, self.height, other._mask) != 0
+            else:
+                are_neighbors = self.overlaps(other) | any(self._touches(c, other._cells) for c in self._cells)
             are_neighbors &= self.coords != other.coords
             if not overlap_allowed:
                 are_neighbors &= not self.overlaps(other)
             return are_neighbors
         
+def label_grid(colors: np.ndarray) -> np.ndarray:
+    """Label the blocks of a color grid (0 is free) in column-major order of appearance.
+
+    Adjacent cells of the same color always belong to the same block, so
+    the blocks are the connected same-color components of the grid.
+    """
+    colors = np.asarray(colors)
+    height, width = colors.shape
+    labels = np.full((height, width), -1, dtype=np.int32)
+    color_list = colors.tolist()
+    label = 0
+    for origin in board_coords(height, width):
+        if (labels[origin] >= 0) or (color_list[origin.x][origin.y] == 0):
+            continue
+        color = color_list[origin.x][origin.y]
+        frontier = [origin]
+        labels[origin] = label
+        while len(frontier) > 0:
+            coord = frontier.pop()
+            for n in coord.get_neighbors():
+                if ((0 <= n.x < height) & (0 <= n.y < width) and
+                        (labels[n] < 0) and (color_list[n.x][n.y] == color)):
+                    labels[n] = label
+                    frontier.append(n)
+        label += 1
+    return labels
+
+class _GridEngine:
+    # (height x width) NumPy grids with the label and color of each cell. For every
+    # color a grid counts the neighboring cells of that color, so a free cell is
+    # available for a color while its count is zero. The grids are stored in
+    # column-major (Fortran) order so that scans follow Board._get_board_coords.
+
+    def __init__(self, height: int, width: int):
+        self.height = height
+        self.width = width
+        self.labels = np.full((height, width), -1, dtype=np.int32, order='F')
+        self.colors = np.zeros((height, width), dtype=np.int32, order='F')
+        self.num_occupied = 0
+        self.forbidden = {}
+        self.num_available = {}
+        self.first_available = {}
+
+    def add(self, block: Block, label: int) -> None:
+        forbidden = self._forbidden(block.color)
+        rows, cols = self._index(block._cells)
+        # the cells of the block are no longer available for any color
+        for color, counts in self.forbidden.items():
+            self.num_available[color] -= int((counts[rows, cols] == 0).sum())
+        self.labels[rows, cols] = label
+        self.colors[rows, cols] = block.color
+        self.num_occupied += len(block._cells)
+
+        border, border_all = self._border(block)
+        newly_forbidden = (forbidden[border] == 0) & (self.labels[border] < 0)
+        self.num_available[block.color] -= int(newly_forbidden.sum())
+        np.add.at(forbidden, border_all, 1)
+
+    def remove(self, block: Block) -> None:
+        forbidden = self.forbidden[block.color]
+        rows, cols = self._index(block._cells)
+        self.labels[rows, cols] = -1
+        self.colors[rows, cols] = 0
+        self.num_occupied -= len(block._cells)
+
+        border, border_all = self._border(block)
+        np.subtract.at(forbidden, border_all, 1)
+        newly_available = (forbidden[border] == 0) & (self.labels[border] < 0)
+        self.num_available[block.color] += int(newly_available.sum())
+        for color, counts in self.forbidden.items():
+            self.num_available[color] += int((counts[rows, cols] == 0).sum())
+
+        # cells before the first available one may have become available again
+        first = min(int(cols.min()), int(border[1].min()) if len(border[1]) > 0 else self.width)
+        for color in self.first_available:
+            self.first_available[color] = min(self.first_available[color], first * self.height)
+
+    def label_at(self, coord: Coord) -> int:
+        return int(self.labels[coord.x, coord.y])
+
+    def within_bounds(self, block: Block) -> bool:
+        row_idx, col_idx = invert_list_of_coords(block.coords)
+        return (((max(row_idx) < self.height) & 
+                 (max(col_idx) < self.width)) &
+                ((min(row_idx) >= 0) & 
+                (min(col_idx) >= 0)))
+
+    def overlaps(self, block: Block) -> bool:
+        rows, cols = self._index(block._cells)
+        return bool((self.labels[rows, cols] >= 0).any())
+
+    def neighbors_same_color(self, block: Block) -> bool:
+        (rows, cols), _ = self._border(block)
+        if len(rows) == 0:
+            return False
+        occupied = self.labels[rows, cols] >= 0
+        return bool((occupied & (self.colors[rows, cols] == block.color)).any())
+
+    def is_available_color(self, coord: Coord, color: int) -> bool:
+        if not ((0 <= coord.x < self.height) & (0 <= coord.y < self.width)):
+            return False
+        if self.labels[coord.x, coord.y] >= 0:
+            return False
+        return (color not in self.forbidden) or (self.forbidden[color][coord.x, coord.y] == 0)
+
+    def num_available_color(self, color: int) -> int:
+        if color not in self.num_available:
+            return self.height * self.width - self.num_occupied
+        return self.num_available[color]
+
+    def first_available_color(self, color: int) -> Coord:
+        if self.num_available_color(color) == 0:
+            return None
+        # cells only become unavailable while blocks are added, so scanning on from
+        # the previous position costs O(1) amortized per block. The column-major
+        # ravels of the Fortran-ordered grids are views, only a chunk is compared.
+        labels = self.labels.ravel(order='F')
+        forbidden = self.forbidden[color].ravel(order='F') if color in self.forbidden else None
+        start = self.first_available.get(color, 0)
+        chunk = 64
+        while True:
+            available = labels[start:start + chunk] < 0
+            if forbidden is not None:
+                available &= forbidden[start:start + chunk] == 0
+            if available.any():
+                break
+            start += chunk
+        start += int(np.argmax(available))
+        self.first_available[color] = start
+        return board_coords(self.height, self.width)[start]
+
+    def first_free(self) -> Coord:
+        if self.num_occupied == self.height * self.width:
+            return None
+        return board_coords(self.height, self.width)[int(np.argmax(self.labels.ravel(order='F') < 0))]
+
+    def color_grid(self) -> np.ndarray:
+        return self.colors.astype(np.uint8, order='C')
+
+    def coords_available(self) -> List[Coord]:
+        return self._mask_to_coords(self.labels < 0)
+
+    def coords_available_color(self, color: int) -> List[Coord]:
+        return self._mask_to_coords(self._available_mask(color))
+
+    def color_coords(self, color: int) -> List[Coord]:
+        return self._mask_to_coords((self.colors == color) & (self.labels >= 0))
+
+    def _forbidden(self, color: int) -> np.ndarray:
+        if color not in self.forbidden:
+            self.num_available[color] = self.num_available_color(color)
+            self.forbidden[color] = np.zeros((self.height, self.width), dtype=np.int32, order='F')
+        return self.forbidden[color]
+
+    def _available_mask(self, color: int) -> np.ndarray:
+        if color not in self.forbidden:
+            return self.labels < 0
+        return (self.labels < 0) & (self.forbidden[color] == 0)
+
+    def _mask_to_coords(self, mask: np.ndarray) -> List[Coord]:
+        # column-major order, matching Board._get_board_coords
+        coords = board_coords(self.height, self.width)
+        return [coords[i] for i in np.flatnonzero(mask.ravel(order='F')).tolist()]
+
+    def _border(self, block: Block) -> Tuple[Tuple[np.ndarray, np.ndarray], Tuple[np.ndarray, np.ndarray]]:
+        # in-bounds neighbors of a block, once and with multiplicity
+        border_all = [n for c in block._cells for n in c.get_neighbors()
+                      if (0 <= n.x < self.height) & (0 <= n.y < self.width) and (n not in block._cells)]
+        return self._index(set(border_all)), self._index(border_all)
+
+    def _index(self, coords) -> Tuple[np.ndarray, np.ndarray]:
+        rows = np.fromiter((c.x for c in coords), dtype=np.intp, count=len(coords))
+        cols = np.fromiter((c.y for c in coords), dtype=np.intp, count=len(coords))
+        return rows, cols
+
+class _BitboardEngine:
+    # one int bitmask for the occupied cells, and per color one for its cells and
+    # one for the cells it may not be placed on (its cells and their neighbors)
+
+    def __init__(self, height: int, width: int):
+        self.height = height
+        self.width = width
+        self.stride = bitmask_stride(height)
+        self.full = bitmask_full(height, width)
+        self.occupied = 0
+        self.color_masks = {}
+        self.forbidden = {}
+        self.labels = [-1] * (self.stride * width)
+        self.coords = [None] * (self.stride * width)
+        for c in board_coords(height, width):
+            self.coords[c.y * self.stride + c.x] = c
+        self.num_occupied = 0
+
+    def add(self, block: Block, label: int) -> None:
+        mask = self._mask(block)
+        self.occupied |= mask
+        self.color_masks[block.color] = self.color_masks.get(block.color, 0) | mask
+        self.forbidden[block.color] = (self.forbidden.get(block.color, 0) |
+                                       bitmask_dilate(mask, self.height, self.full))
+        for c in block._cells:
+            self.labels[c.y * self.stride + c.x] = label
+        self.num_occupied += len(block._cells)
+
+    def remove(self, block: Block) -> None:
+        mask = self._mask(block)
+        self.occupied &= ~mask
+        self.color_masks[block.color] &= ~mask
+        self.forbidden[block.color] = bitmask_dilate(self.color_masks[block.color], self.height, self.full)
+        for c in block._cells:
+            self.labels[c.y * self.stride + c.x] = -1
+        self.num_occupied -= len(block._cells)
+
+    def label_at(self, coord: Coord) -> int:
+        return self.labels[coord.y * self.stride + coord.x]
+
+    def within_bounds(self, block: Block) -> bool:
+        return self._mask(block) is not None
+
+    def overlaps(self, block: Block) -> bool:
+        return (self._mask(block) & self.occupied) != 0
+
+    def neighbors_same_color(self, block: Block) -> bool:
+        mask = self._mask(block)
+        color_mask = self.color_masks.get(block.color, 0) & ~mask
+        return (bitmask_dilate(mask, self.height, self.full) & color_mask) != 0
+
+    def color_grid(self) -> np.ndarray:
+        grid = np.zeros(self.stride * self.width, dtype=np.uint8)
+        num_bytes = (self.stride * self.width + 7) // 8
+        for color, mask in self.color_masks.items():
+            bits = np.unpackbits(np.frombuffer(mask.to_bytes(num_bytes, 'little'), dtype=np.uint8),
+                                 count=len(grid), bitorder='little')
+            grid[bits.astype(bool)] = color
+        return np.ascontiguousarray(grid.reshape(self.width, self.stride)[:, :self.height].T)
+
+    def coords_available(self) -> List[Coord]:
+        return self._mask_to_coords(self.full & ~self.occupied)
+
+    def first_free(self) -> Coord:
+        free = self.full & ~self.occupied
+        if free == 0:
+            return None
+        return self.coords[(free & -free).bit_length() - 1]
+
+    def is_available_color(self, coord: Coord, color: int) -> bool:
+        if not ((0 <= coord.x < self.height) & (0 <= coord.y < self.width)):
+            return False
+        return (self._available_mask(color) >> (coord.y * self.stride + coord.x)) & 1 == 1
+
+    def num_available_color(self, color: int) -> int:
+        return bitmask_popcount(self._available_mask(color))
+
+    def first_available_color(self, color: int) -> Coord:
+        available = self._available_mask(color)
+        if available == 0:
+            return None
+        return self.coords[(available & -available).bit_length() - 1]
+
+    def coords_available_color(self, color: int) -> List[Coord]:
+        return self._mask_to_coords(self._available_mask(color))
+
+    def color_coords(self, color: int) -> List[Coord]:
+        return self._mask_to_coords(self.color_masks.get(color, 0))
+
+    def _available_mask(self, color: int) -> int:
+        return self.full & ~(self.occupied | self.forbidden.get(color, 0))
+
+    def _mask_to_coords(self, mask: int) -> List[Coord]:
+        # ascending bits are in column-major order, matching Board._get_board_coords
+        coords = []
+        while mask:
+            low = mask & -mask
+            coords.append(self.coords[low.bit_length() - 1])
+            mask ^= low
+        return coords
+
+    def _mask(self, block: Block) -> int:
+        # None if the block does not fit on the board
+        if (block._mask is not None) and (block.height == self.height):
+            return block._mask if (block._mask & ~self.full) == 0 else None
+        mask = 0
+        for c in block._cells:
+            if not ((0 <= c.x < self.height) & (0 <= c.y < self.width)):
+                return None
+            mask |= 1 << (c.y * self.stride + c.x)
+        return mask
+
+class _LocalEngine:
+    # flat column-major lists with the label and color of every cell and per color
+    # a count of the neighboring cells of that color (like _GridEngine), updated
+    # cell by cell so every block only touches its own cells and border
+
+    def __init__(self, height: int, width: int):
+        self.height = height
+        self.width = width
+        self.labels = [-1] * (height * width)
+        self.colors = [0] * (height * width)
+        self.coords = board_coords(height, width)
+        self.num_occupied = 0
+        self.forbidden = {}
+        self.num_available = {}
+        self.first_available = {}
+        self.first_free_index = 0
+
+    def add(self, block: Block, label: int) -> None:
+        forbidden = self._forbidden(block.color)
+        labels = self.labels
+        cells = self._index(block._cells)
+        # the cells of the block are no longer available for any color
+        for color, counts in self.forbidden.items():
+            self.num_available[color] -= sum(1 for i in cells if counts[i] == 0)
+        for i in cells:
+            labels[i] = label
+            self.colors[i] = block.color
+        self.num_occupied += len(cells)
+
+        newly_forbidden = 0
+        for i in self._border(block):
+            if (forbidden[i] == 0) and (labels[i] < 0):
+                newly_forbidden += 1
+            forbidden[i] += 1
+        self.num_available[block.color] -= newly_forbidden
+
+    def remove(self, block: Block) -> None:
+        forbidden = self.forbidden[block.color]
+        labels = self.labels
+        cells = self._index(block._cells)
+        for i in cells:
+            labels[i] = -1
+            self.colors[i] = 0
+        self.num_occupied -= len(cells)
+
+        border = self._border(block)
+        newly_available = 0
+        for i in border:
+            forbidden[i] -= 1
+            if (forbidden[i] == 0) and (labels[i] < 0):
+                newly_available += 1
+        self.num_available[block.color] += newly_available
+        for color, counts in self.forbidden.items():
+            self.num_available[color] += sum(1 for i in cells if counts[i] == 0)
+
+        # cells before the first available one may have become available again
+        first = min(cells + border)
+        self.first_free_index = min(self.first_free_index, first)
+        for color in self.first_available:
+            self.first_available[color] = min(self.first_available[color], first)
+
+    def label_at(self, coord: Coord) -> int:
+        return self.labels[coord.y * self.height + coord.x]
+
+    def within_bounds(self, block: Block) -> bool:
+        return all((0 <= c.x < self.height) & (0 <= c.y < self.width) for c in block._cells)
+
+    def overlaps(self, block: Block) -> bool:
+        labels = self.labels
+        return any(labels[i] >= 0 for i in self._index(block._cells))
+
+    def neighbors_same_color(self, block: Block) -> bool:
+        labels, colors = self.labels, self.colors
+        return any((labels[i] >= 0) and (colors[i] == block.color) for i in self._border(block))
+
+    def is_available_color(self, coord: Coord, color: int) -> bool:
+        if not ((0 <= coord.x < self.height) & (0 <= coord.y < self.width)):
+            return False
+        i = coord.y * self.height + coord.x
+        if self.labels[i] >= 0:
+            return False
+        return (color not in self.forbidden) or (self.forbidden[color][i] == 0)
+
+    def num_available_color(self, color: int) -> int:
+        if color not in self.num_available:
+            return self.height * self.width - self.num_occupied
+        return self.num_available[color]
+
+    def first_available_color(self, color: int) -> Coord:
+        if self.num_available_color(color) == 0:
+            return None
+        # cells only become unavailable while blocks are added, so scanning on from
+        # the previous position costs O(1) amortized per block
+        labels = self.labels
+        counts = self.forbidden.get(color)
+        i = self.first_available.get(color, 0)
+        while (labels[i] >= 0) or ((counts is not None) and (counts[i] > 0)):
+            i += 1
+        self.first_available[color] = i
+        return self.coords[i]
+
+    def first_free(self) -> Coord:
+        if self.num_occupied == self.height * self.width:
+            return None
+        labels = self.labels
+        i = self.first_free_index
+        while labels[i] >= 0:
+            i += 1
+        self.first_free_index = i
+        return self.coords[i]
+
+    def color_grid(self) -> np.ndarray:
+        grid = np.array(self.colors, dtype=np.uint8).reshape(self.width, self.height)
+        return np.ascontiguousarray(grid.T)
+
+    def coords_available(self) -> List[Coord]:
+        return [self.coords[i] for i, label in enumerate(self.labels) if label < 0]
+
+    def coords_available_color(self, color: int) -> List[Coord]:
+        counts = self.forbidden.get(color)
+        return [self.coords[i] for i, label in enumerate(self.labels)
+                if (label < 0) and ((counts is None) or (counts[i] == 0))]
+
+    def color_coords(self, color: int) -> List[Coord]:
+        return [self.coords[i] for i, (label, c) in enumerate(zip(self.labels, self.colors))
+                if (label >= 0) and (c == color)]
+
+    def _forbidden(self, color: int) -> bytearray:
+        if color not in self.forbidden:
+            self.num_available[color] = self.num_available_color(color)
+            # a cell has at most 4 neighbors
+            self.forbidden[color] = bytearray(self.height * self.width)
+        return self.forbidden[color]
+
+    def _index(self, coords) -> List[int]:
+        height = self.height
+        return [c.y * height + c.x for c in coords]
+
+    def _border(self, block: Block) -> List[int]:
+        # flat indices of the in-bounds neighbors of a block, with multiplicity
+        height, width, cells = self.height, self.width, block._cells
+        return [n.y * height + n.x for c in cells for n in c.get_neighbors()
+                if (0 <= n.x < height) & (0 <= n.y < width) and (n not in cells)]
+
+ENGINES = {'grid': _GridEngine,
+           'bitboard': _BitboardEngine,
+           'local': _LocalEngine}
+
+# boards with fewer cells use the bitboard engine when the engine is 'auto', its
+# whole-board masks get slower than the local updates of larger boards
+AUTO_ENGINE_CELLS = 1000
+
+def auto_engine(height: int, width: int) -> str:
+    """Return the fastest engine for boards of this size."""
+    return 'bitboard' if height * width < AUTO_ENGINE_CELLS else 'local'
+
 if True:
     @dataclass
     class Board:
         height: int
         width: int
         blocks: List[Block] = field(default_factory=list)
+        engine: str = field(default='auto', compare=False)
+
+        # occupancy index kept in sync by add_block/remove_block,
+        # blocks should therefore not be modified after being added
+        _index: object = field(init=False, repr=False, compare=False)
+        _blocks_by_label: Dict[int, Block] = field(init=False, repr=False, compare=False)
+        # labels of the blocks, ascending as blocks are appended in label order
+        _labels: List[int] = field(init=False, repr=False, compare=False)
+        _next_label: int = field(init=False, repr=False, compare=False)
+
+        def __post_init__(self):
+            if self.engine == 'auto':
+                self.engine = auto_engine(self.height, self.width)
+            assert self.engine in ENGINES
+            self._index = ENGINES[self.engine](self.height, self.width)
+            self._blocks_by_label = {}
+            self._labels = []
+            self._next_label = 0
+            blocks, self.blocks = self.blocks, []
+            for block in blocks:
+                self.add_block(block)
 
         def __str__(self) -> str:
             arr = [["-" for _ in range(self.width)] for _ in range(self.height)]
@@ -141,68 +760,113 @@ if True:
             return arr.__str__().replace('\'', '')
         
         def add_block(self, other: Block) -> None:
+            assert not other.is_empty(other.coords)
+            assert self._within_bounds(other)
             assert not self._overlaps(other)
             assert not self._neighbors_same_color(other)
-            assert self._within_bounds(other)
+            self._index.add(other, self._next_label)
+            self._blocks_by_label[self._next_label] = other
+            self._labels.append(self._next_label)
+            self._next_label += 1
             self.blocks.append(other)
 
         def remove_block(self, other: Block) -> None:
-            self.blocks.remove(other)
+            # the block is looked up by the label of its first cell, which has to be on the board
+            if other.is_empty(other.coords) or not self._within_bounds(other):
+                raise ValueError(f'{other!r} is not on the board')
+            label = self._index.label_at(other.coords[0])
+            if self._blocks_by_label.get(label) != other:
+                raise ValueError(f'{other!r} is not on the board')
+            i = bisect_left(self._labels, label)
+            del self._labels[i]
+            block = self.blocks.pop(i)
+            del self._blocks_by_label[label]
+            self._index.remove(block)
+
+        def block_at(self, coord: Coord) -> Block:
+            return self._blocks_by_label.get(self._index.label_at(coord))
         
         def is_empty(self):
-            if len(self.blocks) == 0:
-                return True
-            for block in self.blocks:
-                if len(block.coords) > 0:
-                    return False
-            return True
+            return self._index.num_occupied == 0
 
         def is_full(self):
             if len(self.blocks) == 0:
                 return False
-            coords = []
-            for block in self.blocks:
-                coords.extend(block.coords)
-            return len(set(coords)) == self.width * self.height
+            return self._index.num_occupied == self.width * self.height
 
         def coords_available(self) -> List[Coord]:
-            coords = self._get_board_coords()
-            for block in self.blocks:
-                coords = [c for c in coords if c not in block.coords]
-            return coords
+            return self._index.coords_available()
 
         def coords_available_color(self, color: int) -> List[Coord]:
-            available_coords = self.coords_available()
-            color_coords = self._get_color_coords(color)
-            color_neighbor_coords = flatten_list([coord.get_neighbors() for coord in color_coords])
-            return [coord for coord in available_coords if coord not in color_neighbor_coords]
+            return self._index.coords_available_color(color)
+
+        def first_free(self) -> Coord:
+            """Return the first free cell (column-major), None if the board is full."""
+            return self._index.first_free()
+
+        def is_available_color(self, coord: Coord, color: int) -> bool:
+            return self._index.is_available_color(coord, color)
+
+        def num_available_color(self, color: int) -> int:
+            return self._index.num_available_color(color)
+
+        def first_available_color(self, color: int) -> Coord:
+            """Return the first cell (column-major) a block of this color can start on."""
+            return self._index.first_available_color(color)
+
+        def viable_colors(self, colors: List[int]) -> List[int]:
+            """Return the colors that can still be placed somewhere on the board."""
+            return [color for color in colors if self._index.num_available_color(color) > 0]
         
         def shape(self):
             return (self.height, self.width)
 
+        def color_grid(self) -> np.ndarray:
+            """Return the (height x width) color grid, 0 for free cells."""
+            return self._index.color_grid()
+
+        def to_grid(self) -> Tuple[np.ndarray, np.ndarray]:
+            """Return the color grid and the grid of block indices (-1 if free)."""
+            colors = np.zeros((self.height, self.width), dtype=np.uint8)
+            labels = np.full((self.height, self.width), -1, dtype=np.int32)
+            for i, block in enumerate(self.blocks):
+                rows, cols = invert_list_of_coords(block.coords)
+                colors[rows, cols] = block.color
+                labels[rows, cols] = i
+            return colors, labels
+
+        @classmethod
+        def from_grid(cls, colors: np.ndarray, labels: np.ndarray = None, engine: str = 'auto') -> Board:
+            """Build a board from a color grid and optionally its block indices (-1 if free)."""
+            colors = np.asarray(colors)
+            height, width = colors.shape
+            if labels is None:
+                labels = label_grid(colors)
+            # column-major flat indices grouped by label
+            flat_labels = np.asarray(labels).T.ravel()
+            order = np.argsort(flat_labels, kind='stable')
+            order = order[flat_labels[order] >= 0]
+            bounds = np.flatnonzero(np.diff(flat_labels[order])) + 1
+            coords = board_coords(height, width)
+            flat_colors = colors.T.ravel().tolist()
+            blocks = []
+            for idx in np.split(order, bounds):
+                idx = idx.tolist()
+                if len(idx) > 0:
+                    blocks.append(Block([coords[i] for i in idx], flat_colors[idx[0]]))
+            return cls(height, width, blocks, engine)
+
         def _get_board_coords(self) -> List[Coord]:
-            coords = [[Coord(i,j) for i in range(self.height)] for j in range(self.width)]
-            return flatten_list(coords)
+            return list(board_coords(self.height, self.width))
 
         def _get_color_coords(self, color: int) -> List[Coord]:
-            color_coords = [block.coords for block in self.blocks if block.color == color]
-            return flatten_list(color_coords)
+            return self._index.color_coords(color)
 
         def _overlaps(self, other: Block) -> bool:
-            for block in self.blocks:
-                if block.overlaps(other):
-                    return True
-            return False
+            return self._index.overlaps(other)
 
         def _neighbors_same_color(self, other: Block) -> bool:
-            for block in self.blocks:
-                if block.neighbors(other, same_color=True):
-                    return True
-            return False
+            return self._index.neighbors_same_color(other)
 
         def _within_bounds(self, other: Block) -> bool:
-            row_idx, col_idx = invert_list_of_coords(other.coords)
-            return (((max(row_idx) < self.height) & 
-                     (max(col_idx) < self.width)) &
-                    ((min(row_idx) >= 0) & 
-                    (min(col_idx) >= 0)))
+            return self._index.within_bounds(other)
@@ -0,0 +1,97 @@
+"""Evaluate a function on every board of a corpus on all cores.
+
+The board records (see `timeaftertime.serialize`) are copied once into
+shared memory. The worker processes read them by index without copying and
+write into a shared result array, so no board or result is pickled.
+
+    records = np.stack(list(iter_boards(seed=1, n=10000, records=True)))
+    scores = evaluate(records, partial(mean_score, n=1000, seed=0))
+
+`func` is called as func(record) with the record of one board and has to be
+picklable, i.e. a module level function or a partial of one. It returns the
+result of the board as a value of `dtype` with `shape`, a structured dtype
+holds several results per board.
+"""
+from __future__ import annotations
+from typing import Any, Callable, Iterable, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+import os
+
+import numpy as np
+
+from timeaftertime.game import GameBoard
+from timeaftertime.stats import to_records
+
+class SharedArray:
+    """A NumPy array in shared memory, pickled by name to attach in other processes."""
+
+    def __init__(self, shape: Tuple[int, ...], dtype: np.dtype, name: str = None):
+        self.shape, self.dtype = tuple(shape), np.dtype(dtype)
+        self.owner = name is None
+        if self.owner:
+            size = max(1, int(np.prod(self.shape)) * self.dtype.itemsize)
+            self.memory = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            # worker processes share the resource tracker of the owner, which unlinks the memory
+            self.memory = shared_memory.SharedMemory(name=name)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.memory.buf)
+
+    def __reduce__(self):
+        return SharedArray, (self.shape, self.dtype, self.memory.name)
+
+    def close(self) -> None:
+        # the array has to be released before the memory can be closed
+        self.array = None
+        self.memory.close()
+        if self.owner:
+            self.memory.unlink()
+
+_records = _results = _func = None
+
+def _init_worker(records: SharedArray, results: SharedArray, func: Callable[[np.ndarray], Any]) -> None:
+    global _records, _results, _func
+    _records, _results, _func = records, results, func
+
+def _evaluate_range(start: int, stop: int) -> None:
+    records, results = _records.array, _results.array
+    for i in range(start, stop):
+        results[i] = _func(records[i])
+
+def _as_records(boards: Union[np.ndarray, Iterable[GameBoard]]) -> np.ndarray:
+    return boards.reshape(-1) if isinstance(boards, np.ndarray) else to_records(boards)
+
+def evaluate(boards: Union[np.ndarray, Iterable[GameBoard]], func: Callable[[np.ndarray], Any],
+             dtype: np.dtype = np.float64, shape: Tuple[int, ...] = (), workers: int = None,
+             chunksize: int = None) -> np.ndarray:
+    """Return the (N, *shape) results of func(record) for every board, in board order.
+
+    The boards are records or GameBoards of the same shape. The work is split
+    into chunks of `chunksize` consecutive boards for `workers` processes (all
+    cores by default, in-process if 1).
+    """
+    records = _as_records(boards)
+    n = len(records)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if (workers == 1) or (n <= 1):
+        results = np.zeros((n,) + tuple(shape), dtype=dtype)
+        for i in range(n):
+            results[i] = func(records[i])
+        return results
+    if chunksize is None:
+        chunksize = max(1, n // (workers * 4))
+
+    shared_records = SharedArray(records.shape, records.dtype)
+    shared_results = SharedArray((n,) + tuple(shape), dtype)
+    try:
+        shared_records.array[...] = records
+        starts = range(0, n, chunksize)
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(shared_records, shared_results, func)) as executor:
+            for _ in executor.map(_evaluate_range, starts, [min(n, s + chunksize) for s in starts]):
+                pass
+        return shared_results.array.copy()
+    finally:
+        shared_records.close()
+        shared_results.close()
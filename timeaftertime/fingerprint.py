@@ -0,0 +1,120 @@
+"""Canonical board fingerprints and duplicate filtering.
+
+Adjacent cells of the same color always belong to the same block, so the
+blocks of a board are fully determined by its color grid. A fingerprint hashes
+the color grid after renumbering the colors in order of first appearance,
+which makes it independent of the block order and of permutations of the
+colors. With mirror=True the smallest of the four mirror images is hashed.
+"""
+from __future__ import annotations
+from typing import Iterable, Iterator, Union
+from hashlib import blake2b
+
+import numpy as np
+
+from timeaftertime.core import Board
+from timeaftertime.game import GameBoard
+
+DIGEST_SIZE = 16
+
+def _color_grid(board: Union[Board, GameBoard, np.ndarray]) -> np.ndarray:
+    if isinstance(board, GameBoard):
+        board = board.board
+    if isinstance(board, Board):
+        return board.color_grid()
+    return np.asarray(board)
+
+def canonical_colors(colors: np.ndarray) -> np.ndarray:
+    """Renumber the colors of (..., H, W) grids by first appearance (row-major), 0 stays 0."""
+    colors = np.asarray(colors)
+    flat = colors.reshape(-1, colors.shape[-2] * colors.shape[-1])
+    palette = np.arange(1, int(flat.max(initial=0)) + 1)
+    matches = flat[:, None, :] == palette[None, :, None]
+    present = matches.any(axis=2)
+    # rank the colors of every grid by the position of their first cell
+    first = np.where(present, matches.argmax(axis=2), flat.shape[1])
+    rank = np.argsort(np.argsort(first, axis=1), axis=1) + 1
+    mapping = np.zeros((len(flat), len(palette) + 1), dtype=np.uint8)
+    mapping[:, 1:] = np.where(present, rank, 0)
+    canonical = np.take_along_axis(mapping, flat.astype(np.intp), axis=1)
+    return canonical.reshape(colors.shape)
+
+def _mirrors(colors: np.ndarray) -> np.ndarray:
+    # (4, ..., H, W) stack of the identity, vertical, horizontal and point mirror images
+    return np.stack([colors, colors[..., ::-1, :], colors[..., :, ::-1], colors[..., ::-1, ::-1]])
+
+def _canonical_bytes(colors: np.ndarray) -> bytes:
+    # single grid version of canonical_colors working on the raw bytes
+    flat = np.ascontiguousarray(colors, dtype=np.uint8).tobytes()
+    firsts = sorted((flat.find(color), color) for color in set(flat) if color != 0)
+    table = bytearray(256)
+    for rank, (_, color) in enumerate(firsts, 1):
+        table[color] = rank
+    return flat.translate(table)
+
+def _digest(canonical: Union[np.ndarray, bytes], height: int, width: int) -> bytes:
+    h = blake2b(digest_size=DIGEST_SIZE)
+    h.update(height.to_bytes(4, 'little') + width.to_bytes(4, 'little'))
+    h.update(canonical if isinstance(canonical, bytes) else
+             np.ascontiguousarray(canonical, dtype=np.uint8).tobytes())
+    return h.digest()
+
+def _smallest(candidates: np.ndarray) -> np.ndarray:
+    # lexicographically smallest of (K, H, W) grids
+    flat = candidates.reshape(len(candidates), -1)
+    best = 0
+    for i in range(1, len(flat)):
+        diff = np.flatnonzero(flat[i] != flat[best])
+        if (len(diff) > 0) and (flat[i, diff[0]] < flat[best, diff[0]]):
+            best = i
+    return candidates[best]
+
+def fingerprint(board: Union[Board, GameBoard, np.ndarray], mirror: bool = False) -> bytes:
+    """Return the canonical fingerprint of a board or (H, W) color grid."""
+    colors = _color_grid(board)
+    height, width = colors.shape
+    if not mirror:
+        return _digest(_canonical_bytes(colors), height, width)
+    mirrors = [colors, colors[::-1, :], colors[:, ::-1], colors[::-1, ::-1]]
+    return _digest(min(_canonical_bytes(c) for c in mirrors), height, width)
+
+def fingerprints(colors: np.ndarray, mirror: bool = False) -> list:
+    """Return the fingerprints of an (N, H, W) batch of color grids."""
+    colors = np.asarray(colors)
+    height, width = colors.shape[-2:]
+    if not mirror:
+        return [_digest(c, height, width) for c in canonical_colors(colors)]
+    canonical = canonical_colors(_mirrors(colors))
+    return [_digest(_smallest(canonical[:, i]), height, width) for i in range(len(colors))]
+
+class Deduplicator:
+    """Streaming filter that remembers the fingerprints of the boards seen so far."""
+
+    def __init__(self, mirror: bool = False):
+        self.mirror = mirror
+        self.seen = set()
+        self.num_duplicates = 0
+
+    def __len__(self) -> int:
+        return len(self.seen)
+
+    def __contains__(self, board) -> bool:
+        return fingerprint(board, self.mirror) in self.seen
+
+    def add(self, board) -> bool:
+        """Remember a board and return whether it was new."""
+        key = fingerprint(board, self.mirror)
+        if key in self.seen:
+            self.num_duplicates += 1
+            return False
+        self.seen.add(key)
+        return True
+
+    def filter(self, boards: Iterable) -> Iterator:
+        for board in boards:
+            if self.add(board):
+                yield board
+
+def unique_boards(boards: Iterable, mirror: bool = False) -> Iterator:
+    """Lazily yield the boards of an iterable skipping duplicates."""
+    return Deduplicator(mirror).filter(boards)
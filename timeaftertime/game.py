@@ -1,30 +1,151 @@
 from __future__ import annotations
 from timeaftertime.core import Coord, Block, Board
-from typing import List, Tuple, Hashable, Generator, Dict
+from typing import List, Tuple, Hashable, Generator, Dict, Callable, Sequence
 from dataclasses import dataclass, field
 
-from random import choice, sample
+from random import Random
 from math import floor, ceil
+from time import perf_counter
+
+class GenerationError(RuntimeError):
+    pass
+
+@dataclass
+class GenerationStats:
+    """Wall time and call counts per generation phase plus event counters.
+
+    Timings are inclusive, e.g. draw_block includes the time spent in
+    _draw_connected_coords and add_block. The optional hook is called as
+    hook(name, value) for every recorded phase (value in seconds) and event.
+
+    The event counters are 'repairs', the dead ends repaired by removing
+    blocks, 'unviable_colors', the colors left out of draw_block because they
+    no longer fit anywhere, summed over all blocks, and 'rejected_placements',
+    the blocks add_block rejected. generate() only places blocks that fit, so
+    a rejection is a bug and aborts it, the counter is for other callers.
+    """
+    seconds: Dict[str, float] = field(default_factory=dict)
+    calls: Dict[str, int] = field(default_factory=dict)
+    counts: Dict[str, int] = field(default_factory=dict)
+    hook: Callable[[str, float], None] = field(default=None, repr=False, compare=False)
+
+    def __getstate__(self):
+        # hooks are usually local callbacks that cannot be pickled
+        state = self.__dict__.copy()
+        state['hook'] = None
+        return state
+
+    def record(self, phase: str, seconds: float) -> None:
+        self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+        self.calls[phase] = self.calls.get(phase, 0) + 1
+        if self.hook is not None:
+            self.hook(phase, seconds)
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counts[name] = self.counts.get(name, 0) + n
+        if self.hook is not None:
+            self.hook(name, n)
+
+    def merge(self, other: GenerationStats) -> None:
+        for phase, seconds in other.seconds.items():
+            self.seconds[phase] = self.seconds.get(phase, 0.0) + seconds
+        for phase, calls in other.calls.items():
+            self.calls[phase] = self.calls.get(phase, 0) + calls
+        for name, n in other.counts.items():
+            self.counts[name] = self.counts.get(name, 0) + n
+
+class _Timed:
+    # wraps a bound method to record its wall time, only installed when instrumenting
+
+    def __init__(self, stats: GenerationStats, phase: str, func: Callable):
+        self.stats = stats
+        self.phase = phase
+        self.func = func
+
+    def __call__(self, *args, **kwargs):
+        start = perf_counter()
+        try:
+            return self.func(*args, **kwargs)
+        finally:
+            self.stats.record(self.phase, perf_counter() - start)
+
+class _TimedAddBlock(_Timed):
+
+    def __call__(self, *args, **kwargs):
+        try:
+            return super().__call__(*args, **kwargs)
+        except AssertionError:
+            self.stats.count('rejected_placements')
+            raise
 
 class GameBoard:
 
-    def __init__(self, height: int = 7, width: int = 15):
+    def __init__(self, height: int = 7, width: int = 15, engine: str = 'auto', seed: int = None,
+                 num_colors: int = 5, num_dice: int = 5, num_star: int = 13, max_block_size: int = 6,
+                 max_repairs: int = 100, time_budget: float = None,
+                 block_size_weights: Sequence[float] = None, color_weights: Sequence[float] = None,
+                 column_caps: Dict[str, int] = None, color_caps: Dict[str, int] = None):
         self.height = height
         self.width = width
-        self.num_colors = 5
-        self.num_dice = 5
-        self.num_star = 13
-        self.max_block_size = 6
+        self.engine = engine
+        self.seed = seed
+        self.rng = Random(seed)
+        self.num_colors = num_colors
+        self.num_dice = num_dice
+        self.num_star = num_star
+        self.max_block_size = max_block_size
+        self.max_repairs = max_repairs
+        self.time_budget = time_budget
+        # target distributions of the block sizes (size i+1 has weight i) and of
+        # the cells per color, giving either one enables the target sampler
+        if (block_size_weights is None) and (color_weights is not None):
+            block_size_weights = [1.0] * max_block_size
+        if (color_weights is None) and (block_size_weights is not None):
+            color_weights = [1.0] * num_colors
+        assert (color_weights is None) or (len(color_weights) == num_colors)
+        self.block_size_weights = None if block_size_weights is None else _normalized(block_size_weights)
+        self.color_weights = None if color_weights is None else _normalized(color_weights)
+        self._size_counts = None
+        self._color_cells = None
+        # maximum number of cells per column/color of an attribute, e.g. {'star': 1}
+        self.column_caps = column_caps or {}
+        self.color_caps = color_caps or {}
+        self.num_repairs = 0
         self.layout = {}
         self.board = None
+        self.stats = None
+        self._deadline = None
+        self._repair_attempts = {}
     
     def __str__(self):
         return self.board.__str__()
 
     def initialize(self):
-        self.board = Board(self.height, self.width)
+        self.board = Board(self.height, self.width, engine=self.engine)
+        if self.block_size_weights is not None:
+            self._size_counts = [0] * len(self.block_size_weights)
+            self._color_cells = [0] * self.num_colors
+        if self.stats is not None:
+            self.board.add_block = _TimedAddBlock(self.stats, 'add_block', self.board.add_block)
+
+    def instrument(self, hook: Callable[[str, float], None] = None) -> GenerationStats:
+        """Start recording timings and counters of the generation phases.
+
+        The timed methods are only wrapped on this instance, so boards that are
+        not instrumented run the plain methods.
+        """
+        self.stats = GenerationStats(hook=hook)
+        for phase in ['draw_block', '_draw_connected_coords', 'draw_layout', 'draw_attributes']:
+            setattr(self, phase, _Timed(self.stats, phase, getattr(type(self), phase).__get__(self)))
+        if self.board is not None:
+            self.board.add_block = _TimedAddBlock(self.stats, 'add_block', type(self.board).add_block.__get__(self.board))
+        return self.stats
 
     def generate(self):
+        if self.time_budget is not None:
+            self._deadline = perf_counter() + self.time_budget
+        self.num_repairs = 0
+        self._repair_attempts = {}
         while not self.board.is_full():
             self.draw_block()
         self.draw_layout()
@@ -33,36 +154,158 @@ class GameBoard:
         self.layout[name] = values
     
     def draw_block(self):
-        available_coords = []
-        colors_list = list(range(1,self.num_colors+1))
-        while len(available_coords) == 0:
-            color = choice(colors_list)
-            available_coords = self.board.coords_available_color(color)
-            colors_list.remove(color)
-        length = choice(range(self.max_block_size))
-        length = min(length, len(available_coords))
-        start_coord = available_coords.pop(0)
-        coords = self._draw_connected_coords(start_coord, available_coords, length)
-        self.board.add_block(Block(coords, color))
-
-    def draw_attributes(self, attributes):
-        coords = []
+        colors_list = self.board.viable_colors(range(1,self.num_colors+1))
+        if self.stats is not None:
+            self.stats.count('unviable_colors', self.num_colors - len(colors_list))
+        if len(colors_list) == 0:
+            self.repair()
+            return
+        if self.block_size_weights is not None:
+            self._draw_target_block(colors_list)
+            return
+        color = self.rng.choice(colors_list)
+        length = self.rng.choice(range(self.max_block_size))
+        length = min(length, self.board.num_available_color(color))
+        start_coord = self.board.first_available_color(color)
+        coords = self._draw_connected_coords(start_coord, color, length)
+        self.board.add_block(self._block(coords, color))
+
+    def repair(self):
+        """Rip up the blocks around a free cell on which no color can be placed.
+
+        Every repair at the same cell widens the ripped up area by one cell, the
+        number of repairs at one cell and the time spent in generate() are
+        bounded by max_repairs and time_budget.
+        """
+        if (self._deadline is not None) and (perf_counter() > self._deadline):
+            raise GenerationError(f'no color can be placed after {self.time_budget}s '
+                                  f'and {self.num_repairs} repairs')
+        dead_coord = self.board.first_free()
+        radius = self._repair_attempts.get(dead_coord, 0) + 1
+        if radius > self.max_repairs:
+            raise GenerationError(f'no color can be placed at {dead_coord} after {self.max_repairs} repairs')
+        self._repair_attempts[dead_coord] = radius
+        blocks = []
+        for i in range(max(0, dead_coord.x - radius), min(self.height, dead_coord.x + radius + 1)):
+            for j in range(max(0, dead_coord.y - radius), min(self.width, dead_coord.y + radius + 1)):
+                block = self.board.block_at(Coord(i,j))
+                if (block is not None) and (dead_coord.distance(Coord(i,j)) <= radius) and \
+                        not any(block is b for b in blocks):
+                    blocks.append(block)
+        for block in blocks:
+            self.board.remove_block(block)
+            if self._size_counts is not None:
+                self._size_counts[len(block.coords)-1] -= 1
+                self._color_cells[block.color-1] -= len(block.coords)
+        self.num_repairs += 1
+        if self.stats is not None:
+            self.stats.count('repairs')
+
+    def _draw_target_block(self, colors_list):
+        """Draw a block steering the sizes and colors towards their target distributions.
+
+        Sizes and colors are weighted by how far they lag behind their target
+        share of the blocks (cells) placed so far. Only sizes that fit in the
+        room around the start cell are drawn, so no block is ever rejected, and
+        colors are weighted by how well their room fits the lagging sizes.
+        """
+        targets = self.block_size_weights
+        placed = sum(self._size_counts)
+        size_weights = [max(t * (placed + 1) - n, 0.0) for t, n in zip(targets, self._size_counts)]
+        cells = sum(self._color_cells) + sum(i * t for i, t in enumerate(targets, 1))
+
+        starts, lengths, weights = [], [], []
+        for color in colors_list:
+            start = self.board.first_available_color(color)
+            room = self._room(start, color, len(targets))
+            fits = size_weights[:room]
+            if sum(fits) == 0:
+                fits = targets[:room]
+            if sum(fits) == 0:
+                # no wanted size fits, fill the room
+                fits = [0.0] * (room - 1) + [1.0]
+            lag = max(self.color_weights[color-1] * cells - self._color_cells[color-1], 0.0)
+            starts.append(start)
+            lengths.append(fits)
+            weights.append(lag * sum(fits))
+        if sum(weights) == 0:
+            weights = [self.color_weights[color-1] * sum(fits) for color, fits in zip(colors_list, lengths)]
+        if sum(weights) == 0:
+            weights = None
+
+        i = self.rng.choices(range(len(colors_list)), weights)[0]
+        color, fits = colors_list[i], lengths[i]
+        length = self.rng.choices(range(1, len(fits) + 1), fits)[0]
+        coords = self._draw_connected_coords(starts[i], color, length)
+        self.board.add_block(self._block(coords, color))
+        self._size_counts[len(coords)-1] += 1
+        self._color_cells[color-1] += len(coords)
+
+    def _room(self, origin, color, limit):
+        # the number of cells (up to limit) a block of color can grow into from origin
+        room = {origin}
+        frontier = [origin]
+        while (len(frontier) > 0) and (len(room) < limit):
+            for c in self._frontier_of(frontier.pop(), color, room):
+                room.add(c)
+                frontier.append(c)
+        return min(len(room), limit)
+
+    def draw_attributes(self, attributes, column_caps=None, color_caps=None, attempts=100):
+        """Place the cells of every attribute, at most one per block and attribute.
+
+        Blocks are visited in random order and a random free cell is drawn from
+        every block until enough cells are placed. The optional caps limit the
+        number of cells of an attribute per column and per color; with caps a
+        pass can get stuck and is retried up to `attempts` times. Raises a
+        ValueError if an attribute cannot be placed.
+        """
+        column_caps = column_caps or {}
+        color_caps = color_caps or {}
+        blocks = self.board.blocks
+        used = set()
         for attribute, num in attributes.items():
-            blocks = self.board.blocks.copy()
-            coords_attribute = []
-            while len(coords_attribute) < num:
-                candidates = range(len(blocks))
-                block = blocks[sample(candidates, k=1)[0]]
-                valid_coords = [c for c in block.coords if c not in coords]
-                if len(valid_coords) > 0:
-                    coords_attribute.append(sample(valid_coords,k=1)[0])
-                blocks.remove(block)
+            column_cap = column_caps.get(attribute)
+            color_cap = color_caps.get(attribute)
+            if num > len(blocks):
+                raise ValueError(f'cannot place {num} {attribute} cells on a board with {len(blocks)} blocks')
+            if (column_cap is not None) and (num > column_cap * self.width):
+                raise ValueError(f'cannot place {num} {attribute} cells with at most {column_cap} '
+                                 f'per column on a board with {self.width} columns')
+            if (color_cap is not None) and (num > color_cap * self.num_colors):
+                raise ValueError(f'cannot place {num} {attribute} cells with at most {color_cap} '
+                                 f'per color and {self.num_colors} colors')
+            for _ in range(attempts if (column_cap is not None) or (color_cap is not None) else 1):
+                coords_attribute = self._place_attribute(num, blocks, used, column_cap, color_cap)
+                if len(coords_attribute) == num:
+                    break
+            else:
+                raise ValueError(f'could only place {len(coords_attribute)} of {num} {attribute} cells')
             self.add_layout(attribute, coords_attribute)
-            coords.extend(coords_attribute)
+            used.update(coords_attribute)
+
+    def _place_attribute(self, num, blocks, used, column_cap, color_cap):
+        # one random pass over the blocks, returns fewer than num cells if it got stuck
+        per_column = [0] * self.width
+        per_color = [0] * (self.num_colors + 1)
+        remaining = list(range(len(blocks)))
+        coords = []
+        while (len(coords) < num) and (len(remaining) > 0):
+            block = blocks[remaining.pop(self.rng.randrange(len(remaining)))]
+            if (color_cap is not None) and (per_color[block.color] >= color_cap):
+                continue
+            valid_coords = [c for c in block.coords if (c not in used) and
+                            ((column_cap is None) or (per_column[c.y] < column_cap))]
+            if len(valid_coords) > 0:
+                coord = valid_coords[self.rng.randrange(len(valid_coords))]
+                coords.append(coord)
+                per_column[coord.y] += 1
+                per_color[block.color] += 1
+        return coords
 
     def draw_layout(self):
         # start column
-        start_column = choice(range(ceil(self.width*1/3),floor(self.width*2/3)))
+        start_column = self.rng.choice(range(ceil(self.width*1/3),floor(self.width*2/3)))
         self.add_layout('start_column', start_column)
         
         # row/col names
@@ -86,31 +329,88 @@ class GameBoard:
 
         # row attributes
         row_attributes = ([1,2,3]*ceil(self.height/3))[:self.height]
-        self.add_layout('row_attributes', sample(row_attributes, k=self.height))
+        self.add_layout('row_attributes', self.rng.sample(row_attributes, k=self.height))
 
         # field attributes
         self.draw_attributes({'dice': self.num_dice,
-                              'star': self.num_star})
+                              'star': self.num_star},
+                             self.column_caps, self.color_caps)
 
     def shape(self):
         return (self.height, self.width)
 
-    def _draw_connected_coords(self, origin, coords, length):
-        stop_loop = False
+    def _draw_connected_coords(self, origin, color, length):
+        # the frontier holds every available neighbor once per block cell it touches,
+        # so growing picks neighbors weighted by the number of block cells they touch
         connected_coords = [origin]
-        while (not stop_loop) and (len(connected_coords) < length):
-            neighboring_coords_list = []
-            for coord in connected_coords:
-                neighboring_coords = [c for c in coords if coord.distance(c) == 1]
-                neighboring_coords_list.extend(neighboring_coords)
-            if len(neighboring_coords_list) == 0:
-                stop_loop = True
-            else:
-                neighboring_coord = choice(neighboring_coords_list)
-                connected_coords.append(neighboring_coord)
-                coords.remove(neighboring_coord)
+        block = {origin}
+        # every cell adds at most 4 entries
+        frontier = _Frontier(4 * max(length, 1))
+        frontier.extend(self._frontier_of(origin, color, block))
+        while (len(frontier) > 0) and (len(connected_coords) < length):
+            neighboring_coord = frontier[self.rng.randrange(len(frontier))]
+            connected_coords.append(neighboring_coord)
+            block.add(neighboring_coord)
+            frontier.discard(neighboring_coord)
+            frontier.extend(self._frontier_of(neighboring_coord, color, block))
         return connected_coords
 
+    def _block(self, coords, color):
+        # blocks on a bitboard board carry their bitmask
+        return Block(coords, color, self.height if self.board.engine == 'bitboard' else None)
+
+    def _frontier_of(self, coord, color, block):
+        return [c for c in coord.get_neighbors()
+                if (c not in block) and self.board.is_available_color(c, color)]
+
+class _Frontier:
+    """Insertion-ordered list of cells with O(log n) removal of all entries of a cell.
+
+    Removed entries leave a gap, a Fenwick tree over the live entries finds the
+    k-th live entry, so indexing matches the list without the removed cells.
+    """
+
+    def __init__(self, capacity: int):
+        self.cells = []
+        self.positions = {}
+        self.tree = [0] * (capacity + 1)
+        self.num_live = 0
+
+    def __len__(self) -> int:
+        return self.num_live
+
+    def extend(self, cells) -> None:
+        for c in cells:
+            self.positions.setdefault(c, []).append(len(self.cells))
+            self.cells.append(c)
+            self._update(len(self.cells), 1)
+        self.num_live += len(cells)
+
+    def discard(self, cell) -> None:
+        for i in self.positions.pop(cell, []):
+            self._update(i + 1, -1)
+            self.num_live -= 1
+
+    def __getitem__(self, k: int):
+        # descend the tree to the first position with k live entries before it
+        position, step = 0, 1 << (len(self.tree) - 1).bit_length()
+        while step > 0:
+            if (position + step < len(self.tree)) and (self.tree[position + step] <= k):
+                position += step
+                k -= self.tree[position]
+            step >>= 1
+        return self.cells[position]
+
+    def _update(self, i: int, delta: int) -> None:
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+def _normalized(weights: Sequence[float]) -> List[float]:
+    total = sum(weights)
+    assert (total > 0) and all(w >= 0 for w in weights)
+    return [w / total for w in weights]
+
 # game_board = GameBoard(7,15)
 # game_board.initialize()
 # game_board.generate()
@@ -0,0 +1,249 @@
+"""Headless rendering of generated boards.
+
+A board is composed into an (H, W, 3) uint8 image by blitting sprites from a
+`SpriteAtlas` with NumPy, so no display is needed. pygame is only used to read
+the sprite images and to write PNG files.
+
+    atlas = SpriteAtlas.load()
+    write_png(render_board(game_board, atlas), 'board.png')
+"""
+from __future__ import annotations
+from typing import Dict, Iterable, List, Tuple, Union
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import os
+
+import numpy as np
+
+from timeaftertime.game import GameBoard
+
+IMAGE_DIR = 'timeaftertime/data/images'
+
+color_dict = {1: 'red', 2: 'blue', 3: 'green', 4: 'orange', 5: 'yellow'}
+special_dict = {1: 'dice', 2: 'bomb', 3: 'heart'}
+
+# define some colors
+BLACK = (0,0,0)
+GREY = (185, 191, 196)
+WHITE = (255,255,255)
+RED = (255,0,0)
+
+# this sets the WIDTH and HEIGHT of each cell
+WIDTH_BLOCKS = 20
+HEIGHT_BLOCKS = 20
+
+# this sets the margin between each cell
+MARGIN_BLOCKS = 1
+MARGIN_SIDE = 4
+MARGIN_LEFT = 7
+MARGIN_TOP = 20
+
+Rect = Tuple[int, int, int, int]
+
+def screen_size(game_board: GameBoard, scale: int = 1) -> Tuple[int, int]:
+    nrows = game_board.height
+    ncols = game_board.width
+    height = nrows * (WIDTH_BLOCKS + MARGIN_BLOCKS) + MARGIN_BLOCKS + MARGIN_SIDE*2 + MARGIN_LEFT + MARGIN_TOP + WIDTH_BLOCKS*4
+    width = ncols * (WIDTH_BLOCKS + MARGIN_BLOCKS) + MARGIN_BLOCKS + MARGIN_SIDE*2 + MARGIN_LEFT*2 + WIDTH_BLOCKS*3
+    return width * scale, height * scale
+
+def board_items(game_board: GameBoard, scale: int = 1) -> List[Tuple[str, Rect, object]]:
+    """Return the drawing operations of a board in drawing order.
+
+    Every item is (kind, rect, value) with kind 'fill' (value is a color) or
+    'image' (value is an image name), rect is (left, top, width, height).
+    Images never overlap each other, only the fills below them.
+    """
+    nrows = game_board.height
+    ncols = game_board.width
+    layout = game_board.layout
+    items = []
+
+    def image(image_name, left, top):
+        items.append(('image', (left, top, WIDTH_BLOCKS, HEIGHT_BLOCKS), image_name))
+
+    # fill background
+    items.append(('fill', (0, 0) + screen_size(game_board), GREY))
+
+    # Draw starting column highlight
+    items.append(('fill', ((MARGIN_BLOCKS + WIDTH_BLOCKS) * layout['start_column'] + MARGIN_SIDE + MARGIN_LEFT + WIDTH_BLOCKS*2,
+                           MARGIN_SIDE + MARGIN_TOP + HEIGHT_BLOCKS - MARGIN_BLOCKS,
+                           WIDTH_BLOCKS+MARGIN_BLOCKS*2,
+                           HEIGHT_BLOCKS*nrows+MARGIN_BLOCKS*(nrows+1)), WHITE))
+
+    # Draw the main board
+    dice = set(layout['dice'])
+    star = set(layout['star'])
+    for block in game_board.board.blocks:
+        color = block.color
+        for coord in block.coords:
+            image_name = f'{color_dict[color]}'
+            if coord in dice:
+                image_name += f'_dice'
+            elif coord in star:
+                image_name += f'_star'
+            image(image_name,
+                  (MARGIN_BLOCKS + WIDTH_BLOCKS) * coord.y + MARGIN_SIDE + MARGIN_LEFT + MARGIN_BLOCKS + WIDTH_BLOCKS*2,
+                  (MARGIN_BLOCKS + HEIGHT_BLOCKS) * coord.x + MARGIN_SIDE + MARGIN_TOP + HEIGHT_BLOCKS)
+
+    # Draw the row scores/specials
+    for row in range(nrows):
+        # row scores
+        image(f'scores/{layout["row_scores"][row]}',
+              MARGIN_LEFT,
+              (MARGIN_BLOCKS + HEIGHT_BLOCKS) * row + MARGIN_SIDE + MARGIN_TOP + HEIGHT_BLOCKS)
+
+        # row specials
+        image(f'{special_dict[layout["row_attributes"][row]]}',
+              MARGIN_LEFT+WIDTH_BLOCKS+MARGIN_BLOCKS,
+              (MARGIN_BLOCKS + HEIGHT_BLOCKS) * row + MARGIN_SIDE + MARGIN_TOP + HEIGHT_BLOCKS)
+
+    # Draw the col scores/specials
+    for column in range(ncols):
+        # col scores top
+        if layout['col_scores_top'][column] == 0:
+            col_score_top = f'dice_2'
+        else:
+            col_score_top = f'scores/{layout["col_scores_top"][column]}'
+        image(col_score_top,
+              (MARGIN_BLOCKS + WIDTH_BLOCKS) * column + MARGIN_SIDE + MARGIN_LEFT + MARGIN_BLOCKS + WIDTH_BLOCKS*2,
+              (MARGIN_BLOCKS + HEIGHT_BLOCKS) * nrows + MARGIN_SIDE + MARGIN_TOP + HEIGHT_BLOCKS + MARGIN_SIDE)
+
+        # col scores bottom
+        if layout['col_scores_bottom'][column] == 0:
+            col_score_bottom = f'dice_0'
+        else:
+            col_score_bottom = f'scores/{layout["col_scores_bottom"][column]}'
+        image(col_score_bottom,
+              (MARGIN_BLOCKS + WIDTH_BLOCKS) * column + MARGIN_SIDE + MARGIN_LEFT + MARGIN_BLOCKS + WIDTH_BLOCKS*2,
+              (MARGIN_BLOCKS + HEIGHT_BLOCKS) * nrows + MARGIN_SIDE + MARGIN_TOP + HEIGHT_BLOCKS*2 + MARGIN_SIDE + MARGIN_BLOCKS)
+
+        # col hearts
+        image('heart_alpha',
+              (MARGIN_BLOCKS + WIDTH_BLOCKS) * column + MARGIN_SIDE + MARGIN_LEFT + MARGIN_BLOCKS + WIDTH_BLOCKS*2,
+              (MARGIN_BLOCKS + HEIGHT_BLOCKS) * nrows + MARGIN_SIDE*2 + MARGIN_TOP + HEIGHT_BLOCKS*3 + MARGIN_BLOCKS*2)
+
+    # Draw row names
+    for row in range(nrows):
+        image(f'rowcol/{layout["row_names"][row]}',
+              (MARGIN_BLOCKS + WIDTH_BLOCKS) * ncols + MARGIN_SIDE*2 + MARGIN_LEFT + WIDTH_BLOCKS*2,
+              (MARGIN_BLOCKS + HEIGHT_BLOCKS) * row + MARGIN_SIDE + MARGIN_TOP + HEIGHT_BLOCKS)
+
+    # Draw col names
+    for column in range(ncols):
+        column_name = f'rowcol/{layout["col_names"][column]}'
+        if layout['col_names'][column] == layout['start_column']:
+            column_name = f'{column_name}_red'
+        image(column_name,
+              (MARGIN_BLOCKS + WIDTH_BLOCKS) * column + MARGIN_SIDE + MARGIN_LEFT + MARGIN_BLOCKS + WIDTH_BLOCKS*2,
+              MARGIN_TOP)
+
+    if scale != 1:
+        items = [(kind, tuple(v * scale for v in rect), value) for kind, rect, value in items]
+    return items
+
+class SpriteAtlas:
+    """All sprites of one size stacked into a single RGBA array."""
+
+    def __init__(self, sprites: Dict[str, np.ndarray]):
+        assert len(sprites) > 0
+        self.names = list(sprites)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        stack = np.stack([self._rgba(sprites[name]) for name in self.names])
+        self.size = stack.shape[1:3]
+        self.rgb = stack[..., :3].astype(np.float32)
+        self.alpha = stack[..., 3:].astype(np.float32) / 255
+
+    @staticmethod
+    def _rgba(sprite: np.ndarray) -> np.ndarray:
+        sprite = np.asarray(sprite, dtype=np.uint8)
+        if sprite.shape[-1] == 3:
+            sprite = np.concatenate([sprite, np.full(sprite.shape[:2] + (1,), 255, dtype=np.uint8)], axis=-1)
+        return sprite
+
+    @classmethod
+    def load(cls, directory: str = IMAGE_DIR, scale: int = 1) -> SpriteAtlas:
+        """Load every PNG below `directory`, named by its relative path without extension."""
+        # pygame is only needed to decode the images
+        import pygame
+
+        size = (WIDTH_BLOCKS * scale, HEIGHT_BLOCKS * scale)
+        sprites = {}
+        for root, _, files in os.walk(directory):
+            for file in sorted(files):
+                if not file.endswith('.png'):
+                    continue
+                path = os.path.join(root, file)
+                name = os.path.relpath(path, directory)[:-len('.png')].replace(os.sep, '/')
+                image = pygame.Surface(size, pygame.SRCALPHA, 32)
+                image.blit(pygame.transform.smoothscale(pygame.image.load(path), size), (0, 0))
+                rgb = pygame.surfarray.array3d(image).swapaxes(0, 1)
+                alpha = pygame.surfarray.array_alpha(image).swapaxes(0, 1)
+                sprites[name] = np.dstack([rgb, alpha])
+        if len(sprites) == 0:
+            raise FileNotFoundError(f'no sprites found in {directory}')
+        return cls(sprites)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.index
+
+def render_board(game_board: GameBoard, atlas: SpriteAtlas, scale: int = 1) -> np.ndarray:
+    """Compose a generated board into an (H, W, 3) uint8 image.
+
+    The sprites of the atlas must be the cell size times `scale`.
+    """
+    assert atlas.size == (HEIGHT_BLOCKS * scale, WIDTH_BLOCKS * scale)
+    width, height = screen_size(game_board, scale)
+    image = np.empty((height, width, 3), dtype=np.float32)
+    tops, lefts, sprites = [], [], []
+    for kind, (left, top, w, h), value in board_items(game_board, scale):
+        if kind == 'fill':
+            image[top:top+h, left:left+w] = value
+        else:
+            tops.append(top)
+            lefts.append(left)
+            sprites.append(atlas.index[value])
+
+    # blend all sprites at once, they do not overlap
+    h, w = atlas.size
+    rows = np.asarray(tops)[:, None, None] + np.arange(h)[None, :, None]
+    cols = np.asarray(lefts)[:, None, None] + np.arange(w)[None, None, :]
+    alpha = atlas.alpha[sprites]
+    image[rows, cols] = image[rows, cols] * (1 - alpha) + atlas.rgb[sprites] * alpha
+    return np.rint(image).astype(np.uint8)
+
+def write_png(image: np.ndarray, path: Union[str, os.PathLike]) -> None:
+    import pygame
+
+    pygame.image.save(pygame.surfarray.make_surface(image.swapaxes(0, 1)), os.fspath(path))
+
+_atlas = None
+
+def _init_worker(directory: str, scale: int) -> None:
+    global _atlas
+    _atlas = SpriteAtlas.load(directory, scale)
+
+def _render_to(item: Tuple[GameBoard, str], scale: int) -> str:
+    game_board, path = item
+    write_png(render_board(game_board, _atlas, scale), path)
+    return path
+
+def render_many(game_boards: Iterable[GameBoard], directory: Union[str, os.PathLike],
+                name: str = 'board_{index:05d}.png', image_dir: str = IMAGE_DIR, scale: int = 1,
+                workers: int = None, chunksize: int = 8) -> List[str]:
+    """Render boards to PNG files in `directory` and return their paths.
+
+    `name` is formatted with the index and seed of every board. Every worker
+    process loads the atlas once, in-process if workers is 1.
+    """
+    os.makedirs(directory, exist_ok=True)
+    items = ((game_board, os.path.join(os.fspath(directory), name.format(index=i, seed=game_board.seed)))
+             for i, game_board in enumerate(game_boards))
+    render = partial(_render_to, scale=scale)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers == 1:
+        _init_worker(image_dir, scale)
+        return [render(item) for item in items]
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(image_dir, scale)) as executor:
+        return list(executor.map(render, items, chunksize=chunksize))
@@ -0,0 +1,179 @@
+"""Compact binary records for generated boards.
+
+A board of size (height, width) with num_dice dice and num_star stars is stored
+as one fixed-size NumPy record (see `board_dtype`): the color grid, the grid of
+block indices, the scores and row attributes and the flat (row-major) cell
+indices of the dice and stars. Only seeds in [0, 2**63) can be stored, a
+board without seed is stored with seed -1. A stream file is a header followed by records,
+each prefixed with its shape so boards of different sizes can be mixed.
+"""
+from __future__ import annotations
+from typing import BinaryIO, Iterator, Union
+from functools import lru_cache
+import numbers
+import os
+import struct
+
+import numpy as np
+
+from timeaftertime.core import Coord, Board
+from timeaftertime.game import GameBoard
+
+MAGIC = b'TATB'
+VERSION = 1
+_FILE_HEADER = struct.Struct('<4sH')
+_RECORD_HEADER = struct.Struct('<HHHH')
+SEED_LIMIT = 2**63
+
+@lru_cache(maxsize=None)
+def board_dtype(height: int, width: int, num_dice: int, num_star: int) -> np.dtype:
+    # cell and block indices need 32 bits once a board has more than 2**16 cells
+    index = np.dtype('<u2') if height * width < 0xFFFF else np.dtype('<u4')
+    return np.dtype([('seed', '<i8'),
+                     ('colors', 'u1', (height, width)),
+                     ('labels', index, (height, width)),
+                     ('start_column', '<u2'),
+                     ('row_scores', 'u1', (height,)),
+                     ('col_scores_top', 'u1', (width,)),
+                     ('col_scores_bottom', 'u1', (width,)),
+                     ('row_attributes', 'u1', (height,)),
+                     ('dice', index, (num_dice,)),
+                     ('star', index, (num_star,))])
+
+def record_shape(record: np.ndarray) -> tuple:
+    """Return (height, width, num_dice, num_star) of a board record."""
+    height, width = record['colors'].shape[-2:]
+    return height, width, record['dice'].shape[-1], record['star'].shape[-1]
+
+def record_bytes(record: np.ndarray) -> bytes:
+    """Return a record prefixed with its shape, as in a stream file."""
+    return _RECORD_HEADER.pack(*record_shape(record)) + record.tobytes()
+
+def record_from_bytes(data: bytes) -> np.ndarray:
+    """Inverse of `record_bytes`."""
+    dtype = board_dtype(*_RECORD_HEADER.unpack_from(data))
+    if len(data) != _RECORD_HEADER.size + dtype.itemsize:
+        raise ValueError('truncated board record')
+    return np.frombuffer(data, dtype=dtype, offset=_RECORD_HEADER.size)[0]
+
+def _packed_seed(seed) -> int:
+    if seed is None:
+        return -1
+    if (not isinstance(seed, numbers.Integral)) or not (0 <= seed < SEED_LIMIT):
+        raise ValueError(f'cannot pack seed {seed!r}, only int seeds in [0, 2**63) fit in a record')
+    return int(seed)
+
+def pack_board(game_board: GameBoard, out: np.ndarray = None) -> np.ndarray:
+    """Pack a generated GameBoard into a record, optionally into an existing record `out`."""
+    height, width = game_board.height, game_board.width
+    layout = game_board.layout
+    dtype = board_dtype(height, width, len(layout['dice']), len(layout['star']))
+    record = np.zeros((), dtype=dtype) if out is None else out
+    colors, labels = game_board.board.to_grid()
+    record['seed'] = _packed_seed(game_board.seed)
+    record['colors'] = colors
+    record['labels'] = np.where(labels < 0, np.iinfo(dtype['labels'].base).max, labels)
+    record['start_column'] = layout['start_column']
+    for name in ['row_scores', 'col_scores_top', 'col_scores_bottom', 'row_attributes']:
+        record[name] = layout[name]
+    for name in ['dice', 'star']:
+        record[name] = [c.x * width + c.y for c in layout[name]]
+    return record
+
+def unpack_board(record: np.ndarray, engine: str = 'auto') -> GameBoard:
+    """Rebuild the GameBoard of a record.
+
+    Blocks keep their order, the coordinates of a block are in column-major order.
+    """
+    height, width, num_dice, num_star = record_shape(record)
+    seed = int(record['seed'])
+    game_board = GameBoard(height, width, engine=engine, seed=None if seed < 0 else seed,
+                           num_dice=num_dice, num_star=num_star)
+    labels = record['labels'].astype(np.int64)
+    labels[labels == np.iinfo(record['labels'].dtype).max] = -1
+    game_board.board = Board.from_grid(record['colors'], labels, engine=engine)
+
+    col_names = list(range(width))
+    game_board.add_layout('start_column', int(record['start_column']))
+    game_board.add_layout('col_names', col_names)
+    game_board.add_layout('row_names', list(range(col_names[-1]+1, col_names[-1]+1+height)))
+    for name in ['row_scores', 'col_scores_top', 'col_scores_bottom', 'row_attributes']:
+        game_board.add_layout(name, record[name].tolist())
+    for name in ['dice', 'star']:
+        game_board.add_layout(name, [Coord(*divmod(i, width)) for i in record[name].tolist()])
+    return game_board
+
+class BoardWriter:
+    """Append board records to a stream file without keeping them in memory.
+
+        with BoardWriter('boards.tatb') as writer:
+            writer.write(game_board)
+    """
+
+    def __init__(self, file: Union[str, os.PathLike, BinaryIO], append: bool = True):
+        self._owns_file = not hasattr(file, 'write')
+        self.file = open(file, 'ab' if append else 'wb') if self._owns_file else file
+        if self.file.tell() == 0:
+            self.file.write(_FILE_HEADER.pack(MAGIC, VERSION))
+        self.num_written = 0
+
+    def __enter__(self) -> BoardWriter:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def write(self, game_board: GameBoard) -> None:
+        self.write_record(pack_board(game_board))
+
+    def write_record(self, record: np.ndarray) -> None:
+        self.file.write(record_bytes(record))
+        self.num_written += 1
+
+    def close(self) -> None:
+        if self._owns_file:
+            self.file.close()
+        else:
+            self.file.flush()
+
+class BoardReader:
+    """Iterate over the records of a stream file one board at a time."""
+
+    def __init__(self, file: Union[str, os.PathLike, BinaryIO]):
+        self._owns_file = not hasattr(file, 'read')
+        self.file = open(file, 'rb') if self._owns_file else file
+        magic, version = _FILE_HEADER.unpack(self.file.read(_FILE_HEADER.size))
+        if (magic != MAGIC) or (version != VERSION):
+            raise ValueError(f'not a version {VERSION} board stream')
+
+    def __enter__(self) -> BoardReader:
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def __iter__(self) -> Iterator[GameBoard]:
+        for record in self.records():
+            yield unpack_board(record)
+
+    def records(self) -> Iterator[np.ndarray]:
+        while True:
+            header = self.file.read(_RECORD_HEADER.size)
+            if len(header) == 0:
+                return
+            if len(header) < _RECORD_HEADER.size:
+                raise ValueError('truncated board stream')
+            dtype = board_dtype(*_RECORD_HEADER.unpack(header))
+            data = self.file.read(dtype.itemsize)
+            if len(data) < dtype.itemsize:
+                raise ValueError('truncated board stream')
+            yield np.frombuffer(data, dtype=dtype)[0]
+
+    def close(self) -> None:
+        if self._owns_file:
+            self.file.close()
+
+def read_boards(path: Union[str, os.PathLike], raw: bool = False) -> Iterator[GameBoard]:
+    """Lazily yield the boards (or their records if raw) of a stream file."""
+    with BoardReader(path) as reader:
+        yield from (reader.records() if raw else reader)
@@ -0,0 +1,234 @@
+"""Local HTTP service that generates boards on a process pool.
+
+    python -m timeaftertime.server --port 8000 --workers 4
+
+    GET /board?height=7&width=15&seed=1&num_star=13          compact JSON
+    GET /board?height=7&width=15&seed=1&format=binary        packed record
+    GET /stats                                               cache counters
+
+Boards are cached by (height, width, seed, settings) with LRU eviction, the
+same seed always gives the same board, seeds are in [0, 2**63). Settings
+that can make generation slow are bounded: num_colors is at least 3,
+max_repairs at most the server's max_repairs, and a board that takes longer
+than the server's time_budget to repair fails with 422. Concurrent requests for a board that
+is being generated wait for the same result. Without a seed the server draws
+one, the seed of every board is part of the response.
+
+A binary response is a packed record prefixed with its shape, see
+`timeaftertime.serialize.record_bytes` and `record_from_bytes`.
+"""
+from __future__ import annotations
+from typing import Dict, Tuple
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor
+from functools import partial
+from random import SystemRandom
+from urllib.parse import parse_qsl, urlsplit
+import argparse
+import asyncio
+import json
+import os
+
+import numpy as np
+
+from timeaftertime.batch import generate_record
+from timeaftertime.game import GenerationError
+from timeaftertime.serialize import SEED_LIMIT, record_bytes
+
+# query parameters passed on to GameBoard
+SETTINGS = {'engine', 'num_colors', 'num_dice', 'num_star', 'max_block_size', 'max_repairs',
+            'block_size_weights', 'color_weights', 'column_caps', 'color_caps'}
+
+_DIGITS = '0123456789abcdefghijklmnopqrstuvwxyz'
+
+def board_json(record: np.ndarray) -> Dict:
+    """Compact JSON representation of a board record.
+
+    The colors are a row-major string with one base-36 digit per cell, 0 for
+    free cells. Blocks are the connected cells of the same color. Dice and
+    stars are flat row-major cell indices.
+    """
+    height, width = record['colors'].shape
+    return {'seed': int(record['seed']),
+            'height': height,
+            'width': width,
+            'colors': ''.join(_DIGITS[c] for c in record['colors'].ravel().tolist()),
+            'start_column': int(record['start_column']),
+            'row_scores': record['row_scores'].tolist(),
+            'col_scores_top': record['col_scores_top'].tolist(),
+            'col_scores_bottom': record['col_scores_bottom'].tolist(),
+            'row_attributes': record['row_attributes'].tolist(),
+            'dice': record['dice'].tolist(),
+            'star': record['star'].tolist()}
+
+class BoardService:
+    """Generate boards on an executor with an LRU cache and request coalescing."""
+
+    def __init__(self, workers: int = None, cache_size: int = 1024, max_cells: int = 250000,
+                 executor: Executor = None, max_repairs: int = 100, time_budget: float = 30.0):
+        self.executor = executor or ProcessPoolExecutor(max_workers=workers or os.cpu_count() or 1)
+        self.cache_size = cache_size
+        self.max_cells = max_cells
+        self.max_repairs = max_repairs
+        self.time_budget = time_budget
+        self.cache = OrderedDict()
+        self.pending = {}
+        self.counts = {'requests': 0, 'hits': 0, 'coalesced': 0, 'generated': 0, 'errors': 0}
+
+    def close(self) -> None:
+        self.executor.shutdown(wait=False)
+
+    @staticmethod
+    def key(height: int, width: int, seed: int, settings: Dict) -> Tuple:
+        return (height, width, seed, json.dumps(settings, sort_keys=True))
+
+    async def get(self, height: int = 7, width: int = 15, seed: int = None, **settings) -> np.ndarray:
+        """Return the packed record of a board, generated at most once per key."""
+        if not all(isinstance(v, int) for v in [height, width] + ([] if seed is None else [seed])):
+            raise TypeError('height, width and seed must be integers')
+        if not ((0 < height) and (0 < width) and (height * width <= self.max_cells)):
+            raise ValueError(f'board size must be positive with at most {self.max_cells} cells')
+        if (seed is not None) and not (0 <= seed < SEED_LIMIT):
+            raise ValueError('seed must be in [0, 2**63)')
+        unknown = set(settings) - SETTINGS
+        if len(unknown) > 0:
+            raise ValueError(f'unknown settings {sorted(unknown)}')
+        # fewer colors run into dead ends all the time, the colors are base-36 digits in JSON
+        limits = {'num_colors': (3, len(_DIGITS) - 1), 'max_repairs': (0, self.max_repairs)}
+        for name, (low, high) in limits.items():
+            if (name in settings) and not (isinstance(settings[name], int) and (low <= settings[name] <= high)):
+                raise ValueError(f'{name} must be an integer from {low} to {high}')
+        if seed is None:
+            seed = SystemRandom().getrandbits(63)
+        self.counts['requests'] += 1
+        key = self.key(height, width, seed, settings)
+        if key in self.cache:
+            self.counts['hits'] += 1
+            self.cache.move_to_end(key)
+            return self.cache[key]
+        if key in self.pending:
+            self.counts['coalesced'] += 1
+            return await asyncio.shield(self.pending[key])
+
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self.executor, partial(generate_record, seed, height, width,
+                                                                 time_budget=self.time_budget, **settings))
+        self.pending[key] = future
+        try:
+            record = await asyncio.shield(future)
+        except Exception:
+            self.counts['errors'] += 1
+            raise
+        finally:
+            del self.pending[key]
+        self.counts['generated'] += 1
+        self.cache[key] = record
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return record
+
+    def stats(self) -> Dict:
+        return dict(self.counts, cached=len(self.cache), pending=len(self.pending))
+
+def _parse_query(query: str) -> Dict:
+    # numbers, lists and dicts are JSON, anything else (e.g. engine=grid) a string
+    params = {}
+    for name, value in parse_qsl(query):
+        try:
+            params[name] = json.loads(value)
+        except ValueError:
+            params[name] = value
+    return params
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+            422: 'Unprocessable Entity', 500: 'Internal Server Error'}
+
+class BoardServer:
+    """Minimal HTTP/1.1 front end (GET only, keep-alive) of a BoardService."""
+
+    def __init__(self, service: BoardService):
+        self.service = service
+
+    async def respond(self, target: str) -> Tuple[int, str, bytes]:
+        url = urlsplit(target)
+        if url.path == '/stats':
+            return 200, 'application/json', json.dumps(self.service.stats()).encode()
+        if url.path != '/board':
+            return 404, 'text/plain', b'not found'
+        params = _parse_query(url.query)
+        binary = params.pop('format', 'json') == 'binary'
+        try:
+            record = await self.service.get(**params)
+        except (TypeError, ValueError, AssertionError, GenerationError) as e:
+            return 422 if isinstance(e, (ValueError, GenerationError)) else 400, 'text/plain', str(e).encode()
+        if binary:
+            return 200, 'application/octet-stream', record_bytes(record)
+        return 200, 'application/json', json.dumps(board_json(record), separators=(',', ':')).encode()
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+                try:
+                    method, target, version = request_line.decode('latin-1').split()
+                except ValueError:
+                    status, content_type, body = 400, 'text/plain', b'bad request line'
+                    version = 'HTTP/1.0'
+                else:
+                    if method != 'GET':
+                        status, content_type, body = 405, 'text/plain', b'only GET is supported'
+                    else:
+                        try:
+                            status, content_type, body = await self.respond(target)
+                        except Exception as e:
+                            status, content_type, body = 500, 'text/plain', repr(e).encode()
+                keep_alive = (version == 'HTTP/1.1') and (headers.get('connection', '').lower() != 'close')
+                writer.write(f'HTTP/1.1 {status} {_REASONS[status]}\r\n'
+                             f'Content-Type: {content_type}\r\n'
+                             f'Content-Length: {len(body)}\r\n'
+                             f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode() + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8000) -> asyncio.AbstractServer:
+        return await asyncio.start_server(self.handle, host, port)
+
+async def serve(host: str = '127.0.0.1', port: int = 8000, workers: int = None, cache_size: int = 1024,
+                time_budget: float = 30.0) -> None:
+    service = BoardService(workers, cache_size, time_budget=time_budget)
+    server = await BoardServer(service).start(host, port)
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8000)
+    parser.add_argument('--workers', type=int, help='generation processes, all cores by default')
+    parser.add_argument('--cache-size', type=int, default=1024, help='number of boards to cache')
+    parser.add_argument('--time-budget', type=float, default=30.0, help='seconds to generate a board')
+    args = parser.parse_args(argv)
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.cache_size, args.time_budget))
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,301 @@
+"""Vectorized Monte Carlo simulation of solo games on a board.
+
+    game_board = generate_board(1)
+    result = simulate(game_board, n=100000, seed=0)
+    result.summary()
+
+All games of a batch are played at once on arrays. Every round three color
+dice (the colors of the board and a joker) and three number dice (1 to 5 and
+a joker) are rolled and the player picks one of each:
+
+- a move marks exactly that many connected free cells of the color, at least
+  one of them in the start column or next to a marked cell; blocks of the
+  same color never touch, so a move stays within one block
+- a joker die costs one of the `jokers` jokers, every marked dice cell gives
+  an extra joker
+- the game ends after `rounds` rounds or once `end_colors` colors are complete
+
+The 'greedy' policy marks as many cells as possible, a used joker counts as
+`joker_cost` cells, and picks the block with the least room that fits the
+move. The 'random' policy picks a random legal move. Both play a number
+joker as the largest number that fits.
+
+A game scores the top (`first=True`) or bottom score of every complete
+column, the row score of every complete row, 5 (or 3) per complete color,
+1 per unused joker and -2 per unmarked star. Row attributes are not played.
+"""
+from __future__ import annotations
+from typing import Dict, List, Tuple, Union
+from dataclasses import dataclass
+from functools import lru_cache
+
+import numpy as np
+
+from timeaftertime.game import GameBoard
+from timeaftertime.serialize import pack_board, record_shape
+
+POLICIES = {'greedy', 'random'}
+
+# blocks are tracked as bitmasks with tables over all (marked, entry) mask pairs
+MAX_BLOCK_CELLS = 8
+MAX_NUMBER = 5
+
+@lru_cache(maxsize=None)
+def _block_tables(size: int, adjacency: Tuple[int, ...]) -> Tuple[np.ndarray, np.ndarray]:
+    # room[m, e] is the most cells one move can mark in a block with marked cells
+    # m and cells e next to marked cells of other blocks (or in the start column),
+    # move[m, e, n] the marked cells after marking n cells
+    full = (1 << size) - 1
+    room = np.zeros((1 << size, 1 << size), dtype=np.uint8)
+    move = np.zeros((1 << size, 1 << size, MAX_NUMBER + 1), dtype=np.uint16)
+    for m in range(1 << size):
+        free = full & ~m
+        touched = 0
+        for i in range(size):
+            if m >> i & 1:
+                touched |= adjacency[i]
+        components = []
+        remaining = free
+        while remaining:
+            component = frontier = remaining & -remaining
+            while frontier:
+                grown = 0
+                for i in range(size):
+                    if frontier >> i & 1:
+                        grown |= adjacency[i]
+                frontier = grown & remaining & ~component
+                component |= frontier
+            remaining &= ~component
+            components.append(component)
+        for e in range(1 << size):
+            eligible = free & (e | touched)
+            reachable = sorted((bin(c).count('1'), c) for c in components if c & eligible)
+            if len(reachable) == 0:
+                continue
+            room[m, e] = min(reachable[-1][0], MAX_NUMBER)
+            for n in range(1, room[m, e] + 1):
+                # the smallest component with room for n cells, grown breadth first
+                component = next(c for k, c in reachable if k >= n)
+                first = component & eligible
+                order = [(first & -first).bit_length() - 1]
+                seen = 1 << order[0]
+                for i in order:
+                    for j in range(size):
+                        if (adjacency[i] >> j & 1) and (component >> j & 1) and not (seen >> j & 1):
+                            seen |= 1 << j
+                            order.append(j)
+                move[m, e, n] = m | sum(1 << i for i in order[:n])
+    return room, move
+
+class _Model:
+    # the board as arrays with a row per cell slot, every block has `slots`
+    # slots (blocks ordered by color) of which the first are its cells; the
+    # state of n games is kept in (rows, n) arrays
+
+    def __init__(self, record: np.ndarray):
+        height, width, _, _ = record_shape(record)
+        colors = record['colors'].astype(np.int64)
+        labels = record['labels'].astype(np.int64)
+        labels[(labels < 0) | (labels >= height * width)] = -1
+        self.height, self.width = height, width
+        self.num_colors = int(colors.max())
+
+        cells_of = {}
+        for cell, label in enumerate(labels.ravel().tolist()):
+            if label >= 0:
+                cells_of.setdefault(label, []).append(cell)
+        blocks = sorted(cells_of.values(), key=lambda cells: colors.flat[cells[0]])
+        if max(len(cells) for cells in blocks) > MAX_BLOCK_CELLS:
+            raise ValueError(f'cannot simulate blocks of more than {MAX_BLOCK_CELLS} cells')
+        self.slots = slots = max(len(cells) for cells in blocks)
+        self.num_slots = num_slots = len(blocks) * slots
+        slot = {c: b * slots + i for b, cells in enumerate(blocks) for i, c in enumerate(cells)}
+        self.cells = np.array(list(slot), dtype=np.int64)
+        self.cell_slots = np.array(list(slot.values()), dtype=np.int64)
+        block_colors = [int(colors.flat[cells[0]]) for cells in blocks]
+
+        # slots of the neighbors in other blocks (num_slots is never marked) and tables per block
+        self.neighbors = np.full((4, num_slots), num_slots, dtype=np.int64)
+        rooms, moves, bases = [], [], []
+        base = 0
+        for b, cells in enumerate(blocks):
+            adjacency = [0] * len(cells)
+            for i, c in enumerate(cells):
+                x, y = divmod(c, width)
+                for k, (nx, ny) in enumerate([(x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)]):
+                    if (0 <= nx < height) and (0 <= ny < width) and (labels[nx, ny] >= 0):
+                        j = slot[nx * width + ny]
+                        if j // slots == b:
+                            adjacency[i] |= 1 << (j % slots)
+                        else:
+                            self.neighbors[k, b * slots + i] = j
+            room, move = _block_tables(len(cells), tuple(adjacency))
+            rooms.append(room.ravel())
+            moves.append(move.reshape(-1, MAX_NUMBER + 1))
+            bases.append(base)
+            base += room.size
+        self.room = np.concatenate(rooms)
+        self.move = np.concatenate(moves)
+        self.block_bases = np.array(bases, dtype=np.int32)[:, None]
+        self.block_shifts = np.array([len(cells) for cells in blocks], dtype=np.int32)[:, None]
+        self.block_full = ((1 << self.block_shifts) - 1).astype(np.uint8)
+        self.start = np.zeros((num_slots, 1), dtype=np.uint8)
+        self.start[self.cell_slots[self.cells % width == int(record['start_column'])]] = 1
+
+        # colors of the dice that are on the board, a missing color has no room
+        present = sorted(set(block_colors))
+        self.color_starts = np.array([block_colors.index(c) for c in present], dtype=np.int64)
+        self.color_column = np.full(self.num_colors + 1, len(present), dtype=np.int64)
+        self.color_column[present] = np.arange(len(present))
+        self.block_color_column = self.color_column[block_colors][:, None]
+
+        self.dice = np.array([slot[i] for i in record['dice'].tolist()], dtype=np.int64)
+        self.star = np.array([slot[i] for i in record['star'].tolist()], dtype=np.int64)
+        self.row_scores = record['row_scores'].astype(np.int64)
+        self.col_scores = {True: record['col_scores_top'].astype(np.int64),
+                           False: record['col_scores_bottom'].astype(np.int64)}
+
+    def marked(self, masks: np.ndarray) -> np.ndarray:
+        # (slots + 1, games) marked cells of the (blocks, games) masks, the last row is never marked
+        marked = np.zeros((self.num_slots + 1, masks.shape[1]), dtype=np.uint8)
+        slots = marked[:-1].reshape(len(masks), self.slots, -1)
+        for k in range(self.slots):
+            slots[:, k] = (masks >> k) & 1
+        return marked
+
+    def entry(self, marked: np.ndarray) -> np.ndarray:
+        # (blocks, games) masks of the cells next to marked cells of other blocks or in the start column
+        entry = marked[self.neighbors[0]] | marked[self.neighbors[1]] | marked[self.neighbors[2]]
+        entry |= marked[self.neighbors[3]] | self.start
+        entry = entry.reshape(-1, self.slots, entry.shape[1])
+        masks = entry[:, 0].copy()
+        for k in range(1, self.slots):
+            masks |= entry[:, k] << k
+        return masks
+
+    def complete(self, masks: np.ndarray) -> np.ndarray:
+        # (colors, games) complete colors
+        return np.minimum.reduceat(masks == self.block_full, self.color_starts, axis=0)
+
+    def grid(self, marked: np.ndarray) -> np.ndarray:
+        # (height, width, games) marked cells, free cells of the board count as marked
+        grid = np.ones((self.height * self.width, marked.shape[1]), dtype=bool)
+        grid[self.cells] = marked[self.cell_slots]
+        return grid.reshape(self.height, self.width, -1)
+
+@dataclass
+class SimulationResult:
+    """Final state of every simulated game."""
+    scores: np.ndarray
+    rounds: np.ndarray
+    cells: np.ndarray
+    columns: np.ndarray
+    rows: np.ndarray
+    colors: np.ndarray
+    jokers: np.ndarray
+    stars: np.ndarray
+
+    def summary(self, percentiles: Tuple[float, ...] = (5, 25, 50, 75, 95)) -> Dict:
+        """Score distribution and completion rates of the games."""
+        scores = self.scores
+        low = int(scores.min())
+        return {'games': len(scores),
+                'mean': float(scores.mean()),
+                'std': float(scores.std()),
+                'min': low,
+                'max': int(scores.max()),
+                'percentiles': dict(zip(percentiles, np.percentile(scores, percentiles).tolist())),
+                'histogram': (low, np.bincount(scores - low).tolist()),
+                'mean_rounds': float(self.rounds.mean()),
+                'mean_cells': float(self.cells.mean()),
+                'column_rate': self.columns.mean(axis=0).tolist(),
+                'row_rate': self.rows.mean(axis=0).tolist(),
+                'color_rate': self.colors.mean(axis=0).tolist(),
+                'mean_jokers': float(self.jokers.mean()),
+                'star_rate': float(self.stars.mean())}
+
+def _play(model: _Model, n: int, rng: np.random.Generator, policy: str, rounds: int, jokers: int,
+          end_colors: int, joker_cost: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    games = np.arange(n)
+    masks = np.zeros((len(model.block_bases), n), dtype=np.uint8)
+    used = np.zeros(n, dtype=np.int64)
+    played = np.zeros(n, dtype=np.int64)
+    active = np.ones(n, dtype=bool)
+    num_columns = len(model.color_starts)
+    for _ in range(rounds):
+        marked = model.marked(masks)
+        index = model.block_bases + (masks.astype(np.int32) << model.block_shifts) + model.entry(marked)
+        room = model.room[index]
+        color_room = np.zeros((num_columns + 1, n), dtype=np.int64)
+        color_room[:-1] = np.maximum.reduceat(room, model.color_starts, axis=0)
+        left = jokers + marked[model.dice].sum(axis=0, dtype=np.int64) - used
+
+        # the 9 pairs of color and number dice, 0 is the joker
+        color_dice = rng.integers(0, model.num_colors + 1, size=(3, n))
+        number_dice = rng.integers(0, MAX_NUMBER + 1, size=(3, n))
+        color_die = np.repeat(color_dice, 3, axis=0)
+        number_die = np.tile(number_dice, (3, 1))
+        any_color = color_die == 0
+        fits = np.where(any_color, color_room.max(axis=0),
+                        np.take_along_axis(color_room, model.color_column[color_die], axis=0))
+        number = np.where(number_die == 0, np.minimum(fits, MAX_NUMBER), number_die)
+        cost = any_color.astype(np.int64) + (number_die == 0)
+        legal = (number >= 1) & (fits >= number) & (cost <= left) & active
+        if policy == 'greedy':
+            value = number - joker_cost * cost
+        else:
+            value = rng.random(legal.shape)
+        pair = np.where(legal, value, -np.inf).argmax(axis=0)
+        move = legal[pair, games]
+        number = number[pair, games]
+
+        # color of a color joker and the block, least room first for 'greedy'
+        key = color_room[:-1] if policy == 'greedy' else rng.random((num_columns, n))
+        joker_column = np.where(color_room[:-1] >= number, key, np.inf).argmin(axis=0)
+        column = np.where(any_color[pair, games], joker_column, model.color_column[color_die[pair, games]])
+        key = room if policy == 'greedy' else rng.integers(0, 255, size=room.shape, dtype=np.uint8)
+        candidates = (model.block_color_column == column) & (room >= number)
+        block = np.where(candidates, key, np.uint8(255)).argmin(axis=0)
+
+        b, g = block[move], games[move]
+        masks[b, g] = model.move[index[b, g], number[move]]
+        used[move] += cost[pair, games][move]
+        played += active
+        active &= model.complete(masks).sum(axis=0) < end_colors
+        if not active.any():
+            break
+    return masks, used, played
+
+def simulate(board: Union[GameBoard, np.ndarray], n: int = 10000, seed: int = None, policy: str = 'greedy',
+             rounds: int = 30, jokers: int = 8, end_colors: int = 2, first: bool = True,
+             joker_cost: float = 1.0, batch_size: int = 4096) -> SimulationResult:
+    """Play n solo games on a GameBoard or board record, see the module docstring for the rules."""
+    assert policy in POLICIES
+    record = pack_board(board) if isinstance(board, GameBoard) else board
+    model = _Model(record)
+    rng = np.random.default_rng(seed)
+    batches = []
+    for start in range(0, n, batch_size):
+        masks, used, played = _play(model, min(batch_size, n - start), rng, policy, rounds, jokers,
+                                    end_colors, joker_cost)
+        marked = model.marked(masks)
+        grid = model.grid(marked)
+        columns = grid.all(axis=0)
+        rows = grid.all(axis=1)
+        complete = model.complete(masks)
+        left = jokers + marked[model.dice].sum(axis=0, dtype=np.int64) - used
+        stars = marked[model.star].sum(axis=0, dtype=np.int64)
+        scores = (model.col_scores[first] @ columns + model.row_scores @ rows
+                  + (5 if first else 3) * complete.sum(axis=0) + left - 2 * (len(model.star) - stars))
+        batches.append((scores, played, marked.sum(axis=0, dtype=np.int64), columns.T, rows.T, complete.T, left, stars))
+    return SimulationResult(*[np.concatenate(values) for values in zip(*batches)])
+
+def simulate_many(boards: List[Union[GameBoard, np.ndarray]], n: int = 10000, seed: int = None,
+                  **settings) -> List[Dict]:
+    """Return the simulation summary of every board, e.g. to rank boards by their mean score."""
+    return [simulate(board, n, None if seed is None else seed + i, **settings).summary()
+            for i, board in enumerate(boards)]
+
+def mean_score(record: np.ndarray, n: int = 1000, seed: int = None, **settings) -> float:
+    """Return the mean score of n games, e.g. as the function of `timeaftertime.evaluate`."""
+    return float(simulate(record, n, seed, **settings).scores.mean())
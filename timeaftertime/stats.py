@@ -0,0 +1,209 @@
+"""Vectorized statistics of board corpora.
+
+The functions work on (N, H, W) color and label grids and on the flat
+(row-major) cell indices of the dice and stars, the fields of the records of
+`timeaftertime.serialize`. A corpus is compared with the real Keer op Keer 2
+board (`real_board`) by the distance between their statistics.
+
+    records = np.stack(list(iter_boards(seed=1, n=1000, records=True)))
+    compare_to_real(records)
+
+The colors of a corpus are 1 to num_colors (0 is free), without num_colors
+the highest color of the grids is used.
+"""
+from __future__ import annotations
+from typing import Dict, Iterable
+
+import numpy as np
+
+from timeaftertime.core import label_grid
+from timeaftertime.game import GameBoard
+from timeaftertime.serialize import board_dtype, pack_board
+
+# the real board, rows P-V and columns A-O, colors as in `Block`:
+# r(ed) 1, b(lue) 2, g(reen) 3, o(range) 4, y(ellow) 5
+_REAL_COLORS = ['rroyyrrggyyooob',
+                'byyyoorrbbyyroo',
+                'bybbbooobggyrro',
+                'obbgbyyboogggrr',
+                'oorrgbbbyooryyy',
+                'ggrogggyyrrrbbg',
+                'yggorggyrrbbbgg']
+_REAL_DICE = [(2, 1), (2, 14), (3, 4), (4, 11), (6, 5)]
+_REAL_STAR = [(0, 2), (0, 5), (0, 10), (0, 11), (1, 9), (2, 7), (3, 1), (3, 3), (3, 12),
+              (4, 14), (5, 6), (5, 13), (6, 0), (6, 4), (6, 8)]
+_REAL_LAYOUT = {'start_column': 7,
+                'row_scores': [5]*7,
+                'col_scores_top': [5, 3, 3, 3, 2, 2, 2, 0, 2, 2, 2, 3, 3, 3, 5],
+                'col_scores_bottom': [3, 2, 2, 2, 1, 1, 1, 0, 1, 1, 1, 2, 2, 2, 3],
+                'row_attributes': [1, 2, 3, 2, 1, 3, 2]}
+
+def real_board() -> np.ndarray:
+    """Return the record of the real Keer op Keer 2 board."""
+    height, width = len(_REAL_COLORS), len(_REAL_COLORS[0])
+    record = np.zeros((), dtype=board_dtype(height, width, len(_REAL_DICE), len(_REAL_STAR)))
+    record['seed'] = -1
+    record['colors'] = [['.rbgoy'.index(c) for c in row] for row in _REAL_COLORS]
+    record['labels'] = label_grid(record['colors'])
+    for name, value in _REAL_LAYOUT.items():
+        record[name] = value
+    record['dice'] = [x * width + y for x, y in _REAL_DICE]
+    record['star'] = [x * width + y for x, y in _REAL_STAR]
+    return record
+
+def to_records(game_boards: Iterable[GameBoard]) -> np.ndarray:
+    """Pack boards of the same shape into an (N,) record array."""
+    return np.stack([pack_board(game_board) for game_board in game_boards])
+
+def _valid(labels: np.ndarray) -> np.ndarray:
+    # free cells are -1 in grids and the maximum index in records
+    height, width = labels.shape[-2:]
+    return (labels >= 0) & (labels < height * width)
+
+def _num_colors(colors: np.ndarray, num_colors: int = None) -> int:
+    max_color = int(np.max(colors)) if np.size(colors) > 0 else 0
+    if num_colors is None:
+        return max_color
+    if max_color > num_colors:
+        raise ValueError(f'the grids have color {max_color}, more than num_colors={num_colors}')
+    return num_colors
+
+def block_sizes(labels: np.ndarray) -> np.ndarray:
+    """Return the (N, H*W) sizes of the blocks of every board by block index (0 if absent)."""
+    labels = np.asarray(labels, dtype=np.int64)
+    n, num_cells = len(labels), labels.shape[-2] * labels.shape[-1]
+    valid = _valid(labels)
+    offsets = np.arange(n)[:, None, None] * num_cells
+    return np.bincount((labels + offsets)[valid], minlength=n * num_cells).reshape(n, num_cells)
+
+def block_colors(colors: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    """Return the (N, H*W) colors of the blocks of every board by block index (0 if absent)."""
+    labels = np.asarray(labels, dtype=np.int64)
+    n, num_cells = len(labels), labels.shape[-2] * labels.shape[-1]
+    valid = _valid(labels)
+    result = np.zeros((n, num_cells), dtype=np.uint8)
+    boards = np.broadcast_to(np.arange(n)[:, None, None], labels.shape)
+    result[boards[valid], labels[valid]] = np.asarray(colors)[valid]
+    return result
+
+def block_size_histogram(labels: np.ndarray) -> np.ndarray:
+    """Return the number of blocks of every size (index 0 is unused) over the corpus."""
+    sizes = block_sizes(labels)
+    return np.bincount(sizes[sizes > 0])
+
+def color_counts(colors: np.ndarray, num_colors: int = None) -> np.ndarray:
+    """Return the (N, num_colors) number of cells of every color."""
+    colors = np.asarray(colors)
+    num_colors = _num_colors(colors, num_colors)
+    flat = colors.reshape(len(colors), -1).astype(np.int64)
+    codes = flat + np.arange(len(colors))[:, None] * (num_colors + 1)
+    counts = np.bincount(codes.ravel(), minlength=len(colors) * (num_colors + 1))
+    return counts.reshape(len(colors), num_colors + 1)[:, 1:]
+
+def block_counts(colors: np.ndarray, labels: np.ndarray, num_colors: int = None) -> np.ndarray:
+    """Return the (N, num_colors) number of blocks of every color."""
+    return color_counts(block_colors(colors, labels)[..., None], _num_colors(colors, num_colors))
+
+def _edges(grid: np.ndarray):
+    # the two cells of all horizontal and vertical neighbor pairs, flattened per board
+    n = len(grid)
+    first = np.concatenate([grid[:, :, :-1].reshape(n, -1), grid[:, :-1, :].reshape(n, -1)], axis=1)
+    second = np.concatenate([grid[:, :, 1:].reshape(n, -1), grid[:, 1:, :].reshape(n, -1)], axis=1)
+    return first, second
+
+def color_adjacency(colors: np.ndarray, num_colors: int = None) -> np.ndarray:
+    """Return the symmetric (num_colors, num_colors) count of neighboring cell pairs by color."""
+    num_colors = _num_colors(colors, num_colors)
+    first, second = _edges(np.asarray(colors, dtype=np.int64))
+    valid = (first > 0) & (second > 0)
+    codes = (first[valid] - 1) * num_colors + (second[valid] - 1)
+    counts = np.bincount(codes, minlength=num_colors * num_colors).reshape(num_colors, num_colors)
+    return counts + counts.T - np.diag(np.diag(counts))
+
+def block_adjacency(colors: np.ndarray, labels: np.ndarray, num_colors: int = None):
+    """Return the symmetric count of neighboring block pairs by color and the (N, H*W) block degrees."""
+    num_colors = _num_colors(colors, num_colors)
+    labels = np.asarray(labels, dtype=np.int64)
+    n, num_cells = len(labels), labels.shape[-2] * labels.shape[-1]
+    first, second = _edges(np.where(_valid(labels), labels, -1))
+    boards = np.broadcast_to(np.arange(n)[:, None], first.shape)
+    valid = (first >= 0) & (second >= 0) & (first != second)
+    low = np.minimum(first, second)[valid]
+    high = np.maximum(first, second)[valid]
+    pairs = np.unique((boards[valid] * num_cells + low) * num_cells + high)
+    board, low, high = pairs // (num_cells * num_cells), (pairs // num_cells) % num_cells, pairs % num_cells
+
+    degrees = np.bincount(np.concatenate([board * num_cells + low, board * num_cells + high]),
+                          minlength=n * num_cells).reshape(n, num_cells)
+    block_color = block_colors(colors, labels).astype(np.int64)
+    codes = (block_color[board, low] - 1) * num_colors + (block_color[board, high] - 1)
+    counts = np.bincount(codes, minlength=num_colors * num_colors).reshape(num_colors, num_colors)
+    return counts + counts.T - np.diag(np.diag(counts)), degrees
+
+def cells_per_column(indices: np.ndarray, width: int) -> np.ndarray:
+    """Return the (N, width) number of dice/stars (flat indices) in every column."""
+    indices = np.asarray(indices, dtype=np.int64)
+    codes = indices % width + np.arange(len(indices))[:, None] * width
+    return np.bincount(codes.ravel(), minlength=len(indices) * width).reshape(len(indices), width)
+
+def cells_per_color(indices: np.ndarray, colors: np.ndarray, num_colors: int = None) -> np.ndarray:
+    """Return the (N, num_colors) number of dice/stars (flat indices) on every color."""
+    colors = np.asarray(colors)
+    num_colors = _num_colors(colors, num_colors)
+    flat = colors.reshape(len(colors), -1)
+    return color_counts(np.take_along_axis(flat, np.asarray(indices, dtype=np.int64), axis=1)[..., None], num_colors)
+
+def _share(counts: np.ndarray) -> np.ndarray:
+    total = counts.sum()
+    return counts / total if total > 0 else counts.astype(float)
+
+def corpus_stats(records: np.ndarray, num_colors: int = None) -> Dict[str, np.ndarray]:
+    """Summarize an (N,) record array.
+
+    The distributions ('*_share') sum to one, the other statistics are means per board.
+    """
+    records = np.atleast_1d(records)
+    colors, labels = records['colors'], records['labels']
+    num_colors = _num_colors(colors, num_colors)
+    width = colors.shape[-1]
+    sizes = block_sizes(labels)
+    adjacency, degrees = block_adjacency(colors, labels, num_colors)
+    stats = {'block_size_share': _share(np.bincount(sizes[sizes > 0])),
+             'mean_block_size': sizes[sizes > 0].mean(),
+             'blocks': (sizes > 0).sum(axis=1).mean(),
+             'color_share': _share(color_counts(colors, num_colors).sum(axis=0)),
+             'blocks_per_color': block_counts(colors, labels, num_colors).mean(axis=0),
+             'color_adjacency_share': _share(color_adjacency(colors, num_colors)),
+             'block_adjacency_share': _share(adjacency),
+             'mean_block_degree': degrees[sizes > 0].mean()}
+    for name in ['dice', 'star']:
+        stats[f'{name}_column_share'] = _share(cells_per_column(records[name], width).sum(axis=0))
+        stats[f'{name}_color_share'] = _share(cells_per_color(records[name], colors, num_colors).sum(axis=0))
+    return stats
+
+def compare(stats: Dict[str, np.ndarray], reference: Dict[str, np.ndarray]) -> Dict[str, float]:
+    """Return the distance of every statistic to the reference.
+
+    Distributions are compared by their total variation distance (0 to 1),
+    means per color by their L1 distance and scalars by their difference to
+    the reference.
+    """
+    result = {}
+    for name, value in stats.items():
+        value, ref = np.asarray(value, dtype=float), np.asarray(reference[name], dtype=float)
+        if name.endswith('_share'):
+            if value.shape != ref.shape:
+                # histograms of different lengths
+                size = max(value.size, ref.size)
+                value = np.pad(value.ravel(), (0, size - value.size))
+                ref = np.pad(ref.ravel(), (0, size - ref.size))
+            result[name] = float(np.abs(value - ref).sum() / 2)
+        else:
+            result[name] = float(value - ref) if value.ndim == 0 else float(np.abs(value - ref).sum())
+    return result
+
+def compare_to_real(records: np.ndarray, num_colors: int = None) -> Dict[str, float]:
+    """Compare a corpus of 7x15 boards with the real board, see `compare`."""
+    # both are summarized with the colors of the real board and of the corpus
+    num_colors = max(_num_colors(records['colors'], num_colors), _num_colors(real_board()['colors']))
+    return compare(corpus_stats(records, num_colors), corpus_stats(real_board(), num_colors))
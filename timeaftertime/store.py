@@ -0,0 +1,128 @@
+"""Memory-mapped store of fixed-size board records.
+
+All boards in a store have the same size and number of dice and stars, so
+board i lives at a fixed offset and can be loaded without reading the rest of
+the file. A side index sorted by seed maps (seed, height, width) to the record.
+"""
+from __future__ import annotations
+from typing import Iterable, List, Union
+import os
+import struct
+
+import numpy as np
+
+from timeaftertime.game import GameBoard
+from timeaftertime.serialize import board_dtype, pack_board, record_shape, unpack_board
+
+MAGIC = b'TATS'
+VERSION = 1
+HEADER_SIZE = 64
+_HEADER = struct.Struct('<4sHHHHH')
+
+INDEX_DTYPE = np.dtype([('seed', '<i8'), ('height', '<u2'), ('width', '<u2'), ('record', '<u8')])
+
+class BoardStore:
+
+    def __init__(self, path: Union[str, os.PathLike], mode: str = 'r'):
+        assert mode in ('r', 'r+')
+        self.path = os.fspath(path)
+        self.mode = mode
+        with open(self.path, 'rb') as f:
+            magic, version, *shape = _HEADER.unpack(f.read(_HEADER.size))
+        if (magic != MAGIC) or (version != VERSION):
+            raise ValueError(f'not a version {VERSION} board store')
+        self.height, self.width, self.num_dice, self.num_star = shape
+        self.dtype = board_dtype(*shape)
+        self._records = None
+        self._index = None
+
+    @classmethod
+    def create(cls, path: Union[str, os.PathLike], height: int = 7, width: int = 15,
+               num_dice: int = 5, num_star: int = 13) -> BoardStore:
+        with open(path, 'wb') as f:
+            f.write(_HEADER.pack(MAGIC, VERSION, height, width, num_dice, num_star).ljust(HEADER_SIZE, b'\0'))
+        if os.path.exists(cls._index_path(path)):
+            os.remove(cls._index_path(path))
+        return cls(path, mode='r+')
+
+    def __len__(self) -> int:
+        return (os.path.getsize(self.path) - HEADER_SIZE) // self.dtype.itemsize
+
+    def __getitem__(self, i: int) -> GameBoard:
+        return unpack_board(self.record(i))
+
+    @property
+    def records(self) -> np.ndarray:
+        """All records as a read-only memory-mapped array."""
+        n = len(self)
+        if (self._records is None) or (len(self._records) != n):
+            if n == 0:
+                return np.zeros(0, dtype=self.dtype)
+            self._records = np.memmap(self.path, dtype=self.dtype, mode='r', offset=HEADER_SIZE, shape=(n,))
+        return self._records
+
+    def record(self, i: int) -> np.ndarray:
+        return self.records[i]
+
+    def append(self, game_board: GameBoard) -> int:
+        """Append a board and return its record index."""
+        self.extend([game_board])
+        return len(self) - 1
+
+    def extend(self, game_boards: Iterable[GameBoard]) -> None:
+        assert self.mode == 'r+'
+        shape = (self.height, self.width, self.num_dice, self.num_star)
+        with open(self.path, 'ab') as f:
+            for game_board in game_boards:
+                record = pack_board(game_board)
+                if record_shape(record) != shape:
+                    raise ValueError(f'board does not fit a store of shape {shape}')
+                f.write(record.tobytes())
+        self._index = None
+
+    def sample(self, k: int, seed: int = None) -> List[GameBoard]:
+        """Load k boards drawn uniformly at random (with replacement)."""
+        rng = np.random.default_rng(seed)
+        return [self[int(i)] for i in rng.integers(0, len(self), size=k)]
+
+    def build_index(self) -> np.ndarray:
+        """Sort the records by seed and write the index next to the store."""
+        seeds = np.asarray(self.records['seed'])
+        order = np.argsort(seeds, kind='stable')
+        index = np.zeros(len(seeds), dtype=INDEX_DTYPE)
+        index['seed'] = seeds[order]
+        index['height'] = self.height
+        index['width'] = self.width
+        index['record'] = order
+        np.save(self._index_path(self.path), index)
+        self._index = index
+        return index
+
+    @property
+    def index(self) -> np.ndarray:
+        if self._index is None:
+            path = self._index_path(self.path)
+            if os.path.exists(path):
+                self._index = np.load(path, mmap_mode='r')
+            if (self._index is None) or (len(self._index) != len(self)):
+                self._index = self.build_index() if self.mode == 'r+' else None
+            if self._index is None:
+                raise ValueError(f'the seed index of {self.path} is missing or out of date')
+        return self._index
+
+    def find(self, seed: int, height: int = None, width: int = None) -> int:
+        """Return the record index of the board generated with seed."""
+        if ((height is not None) and (height != self.height)) or ((width is not None) and (width != self.width)):
+            raise KeyError((seed, height, width))
+        index = self.index
+        i = int(np.searchsorted(index['seed'], seed))
+        if (i == len(index)) or (index['seed'][i] != seed):
+            raise KeyError((seed, height, width))
+        return int(index['record'][i])
+
+    def get(self, seed: int, height: int = None, width: int = None) -> GameBoard:
+        return self[self.find(seed, height, width)]
+
+    @staticmethod
+    def _index_path(path: Union[str, os.PathLike]) -> str:
+        return f'{os.fspath(path)}.idx.npy'
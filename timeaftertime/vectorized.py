@@ -0,0 +1,127 @@
+from __future__ import annotations
+from typing import Tuple
+
+import numpy as np
+
+from timeaftertime.core import Board
+from timeaftertime.game import GameBoard, GenerationError
+
+def _dilate(mask: np.ndarray) -> np.ndarray:
+    # extend a (..., H, W) mask with its horizontal and vertical neighbors
+    dilated = mask.copy()
+    dilated[..., 1:, :] |= mask[..., :-1, :]
+    dilated[..., :-1, :] |= mask[..., 1:, :]
+    dilated[..., :, 1:] |= mask[..., :, :-1]
+    dilated[..., :, :-1] |= mask[..., :, 1:]
+    return dilated
+
+def _count_neighbors(mask: np.ndarray) -> np.ndarray:
+    # number of horizontal and vertical neighbors of each cell inside a (..., H, W) mask
+    counts = np.zeros(mask.shape, dtype=np.int32)
+    counts[..., 1:, :] += mask[..., :-1, :]
+    counts[..., :-1, :] += mask[..., 1:, :]
+    counts[..., :, 1:] += mask[..., :, :-1]
+    counts[..., :, :-1] += mask[..., :, 1:]
+    return counts
+
+def _weighted_choice(rng: np.random.Generator, weights: np.ndarray) -> np.ndarray:
+    # one flat index per row of an (N, K) weight array, rows must have a positive total
+    cumulative = np.cumsum(weights, axis=1)
+    draws = rng.random(len(weights)) * cumulative[:, -1]
+    return (cumulative <= draws[:, None]).sum(axis=1)
+
+def _first_column_major(mask: np.ndarray) -> np.ndarray:
+    # flat (row-major) index of the first cell of each (H, W) mask in column-major order
+    n, height, width = mask.shape
+    first = np.argmax(mask.transpose(0, 2, 1).reshape(n, -1), axis=1)
+    cols, rows = np.divmod(first, height)
+    return rows * width + cols
+
+def generate_grids(n: int, height: int = 7, width: int = 15, seed: int = None,
+                   num_colors: int = 5, max_block_size: int = 6,
+                   max_restarts: int = 1000) -> Tuple[np.ndarray, np.ndarray]:
+    """Generate n boards at once, returning (n, height, width) color and label arrays.
+
+    The boards follow the rules of `GameBoard.draw_block`: every step places one
+    block on each unfinished board, with a color drawn uniformly from the colors
+    that still fit somewhere, starting at the first cell (column-major) where that
+    color fits and growing to a length drawn from range(max_block_size), picking
+    neighbors weighted by the number of block cells they touch. Boards that run
+    into a cell where no color fits are regenerated from scratch, at most
+    max_restarts times per board before a GenerationError is raised. Labels
+    number the blocks of each board in order of placement.
+    """
+    rng = np.random.default_rng(seed)
+    colors = np.zeros((n, height, width), dtype=np.uint8)
+    labels = np.full((n, height, width), -1, dtype=np.int32)
+    num_blocks = np.zeros(n, dtype=np.int32)
+    num_restarts = np.zeros(n, dtype=np.int64)
+    palette = np.arange(1, num_colors + 1, dtype=np.uint8)[None, :, None, None]
+
+    active = np.flatnonzero((labels < 0).reshape(n, -1).any(axis=1))
+    while len(active) > 0:
+        free = labels[active] < 0
+        m = len(active)
+        # (m, colors, H, W) cells where each color can still be placed
+        available = free[:, None] & ~_dilate(colors[active][:, None] == palette)
+        viable = available.reshape(m, num_colors, -1).any(axis=2)
+
+        dead = ~viable.any(axis=1)
+        restart = active[dead]
+        if dead.any():
+            num_restarts[restart] += 1
+            if num_restarts[restart].max() > max_restarts:
+                raise GenerationError(f'no color can be placed after {max_restarts} restarts of a board')
+            colors[restart] = 0
+            labels[restart] = -1
+            num_blocks[restart] = 0
+            keep = ~dead
+            active, available, viable, m = active[keep], available[keep], viable[keep], int(keep.sum())
+            if m == 0:
+                active = restart
+                continue
+
+        color_idx = _weighted_choice(rng, viable.astype(np.float64))
+        available = available[np.arange(m), color_idx]
+        num_available = available.reshape(m, -1).sum(axis=1)
+        length = np.minimum(rng.integers(0, max_block_size, size=m), num_available)
+
+        block = np.zeros((m, height, width), dtype=bool)
+        start = _first_column_major(available)
+        block.reshape(m, -1)[np.arange(m), start] = True
+        available.reshape(m, -1)[np.arange(m), start] = False
+        size = np.ones(m, dtype=np.int64)
+        for _ in range(1, max_block_size):
+            growing = np.flatnonzero(size < length)
+            if len(growing) == 0:
+                break
+            weights = (_count_neighbors(block[growing]) * available[growing]).reshape(len(growing), -1)
+            has_room = weights.sum(axis=1) > 0
+            growing, weights = growing[has_room], weights[has_room]
+            if len(growing) == 0:
+                break
+            cell = _weighted_choice(rng, weights)
+            block.reshape(m, -1)[growing, cell] = True
+            available.reshape(m, -1)[growing, cell] = False
+            size[growing] += 1
+
+        board_idx, rows, cols = np.nonzero(block)
+        colors[active[board_idx], rows, cols] = palette.ravel()[color_idx][board_idx]
+        labels[active[board_idx], rows, cols] = num_blocks[active][board_idx]
+        num_blocks[active] += 1
+        active = active[(labels[active] < 0).reshape(len(active), -1).any(axis=1)]
+        active = np.union1d(active, restart)
+
+    return colors, labels
+
+def to_board(colors: np.ndarray, labels: np.ndarray = None, engine: str = 'auto') -> Board:
+    """Convert one (height, width) color/label grid of `generate_grids` into a Board."""
+    return Board.from_grid(colors, labels, engine=engine)
+
+def to_game_board(colors: np.ndarray, labels: np.ndarray = None, seed: int = None, **settings) -> GameBoard:
+    """Convert one generated grid into a GameBoard and draw its layout."""
+    height, width = np.shape(colors)
+    game_board = GameBoard(height, width, seed=seed, **settings)
+    game_board.board = to_board(colors, labels, engine=game_board.engine)
+    game_board.draw_layout()
+    return game_board